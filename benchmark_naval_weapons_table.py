@@ -0,0 +1,137 @@
+import os
+import io
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import importlib.util
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import naval_weapons_table as nwt
+from naval_synthetic_data import generate_game_data, use_game_data
+
+# Benchmarks of naval_weapons_table.py on a synthetic game data tree (see naval_synthetic_data.py), so the performance can be measured without a game install.
+# Every stage is run --repeat times and the best and median wall times are reported. "cold" stages start without the saved indexes/caches, "warm" ones reuse them.
+#
+# python benchmark_naval_weapons_table.py --weapons 2000 --ships 1000 --save before.json
+# python benchmark_naval_weapons_table.py --weapons 2000 --ships 1000 --compare before.json
+
+
+def measure(function, repeat, setup=None):
+    """Runs function repeat times (calling setup before each run, untimed) and returns the wall times in seconds."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def remove(path):
+    path = Path(path)
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def run_benchmarks(paths, output_folder, repeat, caliber_from_mm, caliber_to_mm, formats, ranges=None):
+    """Yields (stage name, wall times) for every stage, in the order they are run."""
+    weapons, units = paths["weapons"], paths["units"]
+    translations_cache = Path(paths["units_csv"]).with_name(nwt.TRANSLATIONS_CACHE)
+    unit_index = Path(units) / nwt.UNIT_INDEX_FILE
+    weapon_index = Path(weapons) / nwt.WEAPON_INDEX_FILE
+
+    def load_translations():
+        nwt.weapon_name_translation_dict, nwt.bullet_name_translation_dict, nwt.unit_name_translation_dict, nwt.unit_type_translation_dict = nwt.load_translations()
+
+    yield "load_translations (cold)", measure(load_translations, repeat, lambda: remove(translations_cache))
+    yield "load_translations (warm)", measure(load_translations, repeat)
+    yield "build_ship_and_mod_maps (cold)", measure(lambda: nwt.build_ship_and_mod_maps(units), repeat, lambda: remove(unit_index))
+    yield "build_ship_and_mod_maps (warm)", measure(lambda: nwt.build_ship_and_mod_maps(units), repeat)
+    ship_names = [path.stem for path in Path(units).glob("*.blkx")]
+    yield "load_br_values (all units)", measure(nwt.load_br_values, repeat)
+    yield "load_br_values (ships only)", measure(lambda: nwt.load_br_values(ship_names), repeat)
+    yield "load_weapon_index (cold)", measure(lambda: nwt.load_weapon_index(weapons), repeat, lambda: remove(weapon_index))
+    yield "load_weapon_index (warm)", measure(lambda: nwt.load_weapon_index(weapons), repeat)
+    yield "iter_shell_records", measure(lambda: sum(1 for _ in nwt.iter_shell_records(weapons, units, caliber_from_mm, caliber_to_mm)), repeat)
+
+    for output_format in formats:
+        output_file = Path(output_folder) / f"naval_weapons_table.{output_format}"
+        yield f"parse_blkx_files --outputformat {output_format}", measure(
+            lambda: nwt.parse_blkx_files(weapons, units, output_format, str(output_file), caliber_from_mm, caliber_to_mm),
+            repeat, lambda: remove(output_file)
+        )
+    if ranges:
+        output_file = Path(output_folder) / "naval_weapons_table_ranges.json"
+        yield f"parse_blkx_files --ranges ({len(ranges)} ranges, json)", measure(
+            lambda: nwt.parse_blkx_files(weapons, units, 'json', str(output_file), caliber_from_mm, caliber_to_mm, ranges), repeat
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark naval_weapons_table.py on synthetic game data.")
+    parser.add_argument('--weapons', type=int, default=1000, help="Number of generated weapon files")
+    parser.add_argument('--ships', type=int, default=500, help="Number of generated ships")
+    parser.add_argument('--vehicles', type=int, default=5000, help="Number of tanks and aircraft added to wpcost.blkx")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed of the generated data")
+    parser.add_argument('--repeat', type=int, default=3, help="How many times each stage is run")
+    parser.add_argument('--from', dest='caliber_from_mm', type=float, default=0, help="Minimum calibre (in millimeters), by default all guns are included")
+    parser.add_argument('--to', dest='caliber_to_mm', type=float, default=500, help="Maximum calibre (in millimeters)")
+    parser.add_argument('--formats', default=','.join(nwt.WRITERS), help="Comma-separated output formats to benchmark. parquet is skipped if pyarrow isn't installed")
+    parser.add_argument('--ranges', type=lambda value: [float(r) for r in value.split(',')], default=[0, 5000, 10000, 15000, 20000], help="Distances used to benchmark --ranges. Skipped if numpy isn't installed")
+    parser.add_argument('--data', help="Folder for the generated data, kept after the run. By default a temporary folder is used and removed")
+    parser.add_argument('--save', help="Save the results as json, to compare against later")
+    parser.add_argument('--compare', help="Results saved earlier with --save, shown next to the current ones")
+    args = parser.parse_args()
+
+    formats = [f for f in args.formats.split(',') if f]
+    for output_format in formats:
+        if output_format not in nwt.WRITERS:
+            parser.error(f"unknown output format {output_format}")
+    if 'parquet' in formats and importlib.util.find_spec('pyarrow') is None:
+        print("pyarrow is not installed, skipping the parquet format")
+        formats.remove('parquet')
+    ranges = args.ranges if importlib.util.find_spec('numpy') is not None else None
+    if ranges is None:
+        print("numpy is not installed, skipping --ranges")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+
+    root = args.data or tempfile.mkdtemp(prefix="naval_benchmark_")
+    results = {}
+    try:
+        print(f"Generating {args.weapons} weapons, {args.ships} ships and {args.vehicles} other vehicles in {root}")
+        paths = generate_game_data(root, args.weapons, args.ships, args.seed, other_vehicles=args.vehicles)
+        use_game_data(nwt, paths)
+        output_folder = Path(root) / "output"
+        output_folder.mkdir(exist_ok=True)
+
+        print(f"{'Stage':<48} {'best (ms)':>10} {'median (ms)':>12}" + (f" {'baseline':>10} {'change':>8}" if baseline else ""))
+        for stage, times in run_benchmarks(paths, output_folder, args.repeat, args.caliber_from_mm, args.caliber_to_mm, formats, ranges):
+            best, median = min(times) * 1000, statistics.median(times) * 1000
+            results[stage] = {"best": best, "median": median}
+            line = f"{stage:<48} {best:>10.1f} {median:>12.1f}"
+            if stage in baseline:
+                line += f" {baseline[stage]['best']:>10.1f} {(best / baseline[stage]['best'] - 1) * 100:>+7.0f}%"
+            print(line, flush=True)
+    finally:
+        if not args.data:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({"weapons": args.weapons, "ships": args.ships, "seed": args.seed, "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"Results saved to {os.path.abspath(args.save)}")
+
+if __name__ == "__main__":
+    main()
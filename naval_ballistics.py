@@ -0,0 +1,86 @@
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("Error: The 'numpy' package is not installed.\nTo install it, run: pip install numpy")
+
+# Batch versions of the ballistic calculations of naval_weapons_table.py.
+# All functions take equally long arrays (one element per shell) and work on the whole batch at once.
+
+AIR_DENSITY = 1.225 # kg/m3, sea level
+KFBR = 1900.0
+
+# Filler penalty (knap) of the Jacob de Marre formula: (filler %, multiplier) points, linear in-between and flat outside
+KNAP_FILLER_PCT = [0.65, 1.6, 2.0, 3.0, 4.0]
+KNAP_MULTIPLIER = [1.0, 0.93, 0.9, 0.85, 0.75]
+
+
+def jacob_de_marre_ap(caliber, mass, speed, explosive_mass, apcbc):
+    """
+    Vectorized equivalent of naval_weapons_table.jacob_de_marre_ap (unrounded).
+
+    Parameters (arrays):
+    - caliber: projectile diameter in millimeters
+    - mass: projectile mass in kilograms
+    - speed: projectile velocity in meters per second
+    - explosive_mass: weight of explosive filler in kilograms
+    - apcbc: True for capped shells, False for uncapped
+
+    Returns:
+    - Penetration in millimeters. Shells without mass get 0.
+    """
+    caliber, mass, speed, explosive_mass = (np.asarray(a, dtype=float) for a in (caliber, mass, speed, explosive_mass))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tnt_pct = np.where(mass > 0, explosive_mass / mass * 100.0, 0.0)
+        knap = np.interp(tnt_pct, KNAP_FILLER_PCT, KNAP_MULTIPLIER)
+        cap_factor = np.where(np.asarray(apcbc, dtype=bool), 1.0, 0.9)
+        pen = (
+            (speed ** 1.43) * (mass ** 0.71) /
+            ((KFBR ** 1.43) * ((caliber / 100.0) ** 1.07))
+        ) * 100.0 * knap * cap_factor
+    return np.where((mass > 0) & (caliber > 0), pen, 0.0)
+
+
+def drag_coefficient(caliber, mass, cx):
+    """k = rho * Cx * A / (2 * m), so that dv/dx = -k * v for a shell slowed down only by the air drag."""
+    caliber, mass, cx = (np.asarray(a, dtype=float) for a in (caliber, mass, cx))
+    area = np.pi * (caliber / 2000.0) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(mass > 0, AIR_DENSITY * cx * area / (2.0 * mass), 0.0)
+
+
+def velocity_at_ranges(speed, k, ranges):
+    """
+    Velocity of every shell at every range, as a (shells, ranges) array.
+    Integrates dv/dx = -k * v along a flat trajectory (gravity is ignored), which gives v(x) = v0 * exp(-k * x).
+    """
+    speed = np.asarray(speed, dtype=float)[:, None]
+    return speed * np.exp(-np.asarray(k, dtype=float)[:, None] * np.asarray(ranges, dtype=float)[None, :])
+
+
+def time_of_flight(speed, k, ranges):
+    """
+    Time (s) needed to reach every range, as a (shells, ranges) array: t(x) = (exp(k * x) - 1) / (k * v0), or x / v0 without drag.
+    NaN where the range can't be reached (no speed, or the time overflows).
+    """
+    speed = np.asarray(speed, dtype=float)[:, None]
+    k = np.asarray(k, dtype=float)[:, None]
+    x = np.asarray(ranges, dtype=float)[None, :]
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        tof = np.where(k > 0, np.expm1(k * x) / (k * speed), x / speed)
+    return np.where((speed > 0) & np.isfinite(tof), tof, np.nan)
+
+
+def penetration_table(caliber, mass, speed, explosive_mass, apcbc, cx, demarre_k, ranges):
+    """
+    Penetration (mm, 0° angle) and time of flight (s) of every shell at every range.
+    Returns two (shells, ranges) arrays.
+    """
+    k = drag_coefficient(caliber, mass, cx)
+    velocities = velocity_at_ranges(speed, k, ranges)
+    shells, count = velocities.shape
+    pen = jacob_de_marre_ap(
+        np.repeat(caliber, count), np.repeat(mass, count), velocities.ravel(),
+        np.repeat(explosive_mass, count), np.repeat(apcbc, count)
+    ).reshape(shells, count)
+    pen *= np.asarray(demarre_k, dtype=float)[:, None]
+    return pen, time_of_flight(speed, k, ranges)
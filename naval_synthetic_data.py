@@ -0,0 +1,218 @@
+import os
+import csv
+import json
+import random
+import argparse
+from pathlib import Path
+
+# Generator of a synthetic, unpacked game data tree for naval_weapons_table.py, so it can be tested and benchmarked without a game install.
+# The layout mirrors the folders created by vromfs_unpacker.py:
+#   aces.vromfs.bin_u/gamedata/weapons/navalmodels_weapons/*.blkx
+#   aces.vromfs.bin_u/gamedata/units/ships/*.blkx (+ weaponpresets/*.blkx)
+#   char.vromfs.bin_u/config/wpcost.blkx
+#   lang.vromfs.bin_u/lang/units_weaponry.csv and units.csv
+# Only the .blkx files are written, so the unpack step of the script has nothing to do.
+#
+# python naval_synthetic_data.py "C:\temp\synthetic" --weapons 2000 --ships 1000
+
+# Calibres (in meters) of the generated guns, from the secondary guns to the battleship main guns
+CALIBERS = [0.076, 0.1, 0.102, 0.12, 0.127, 0.13, 0.138, 0.152, 0.155, 0.203, 0.24, 0.283, 0.305, 0.33, 0.356, 0.381, 0.406, 0.46]
+# bulletType values with a mass multiplier and an explosive filler fraction typical for them
+BULLET_TYPES = {
+    "apcbc_tank": (1.0, 0.015),
+    "apc_tank": (1.0, 0.0),
+    "aphe_tank": (1.0, 0.025),
+    "aphebc_tank": (1.0, 0.02),
+    "sap_tank": (0.95, 0.05),
+    "sapcbc_tank": (0.95, 0.04),
+    "common_tank": (0.9, 0.06),
+    "special_common_tank": (0.9, 0.05),
+    "he_frag_tank": (0.8, 0.1),
+    "he_frag_base_fuse_tank": (0.8, 0.09),
+    "he_frag_dist_fuse": (0.75, 0.08),
+    "he_frag_radio_fuse": (0.75, 0.08),
+    "shrapnel_tank": (0.8, 0.01),
+}
+NATIONS = ["us", "germ", "uk", "jp", "ussr", "it", "fr", "cn"]
+SHIP_CLASSES = ["Destroyer", "Light cruiser", "Heavy cruiser", "Battlecruiser", "Battleship", "Frigate"]
+LANGUAGES = ["English", "French", "German"]
+
+
+def game_data_paths(root):
+    """Paths of the synthetic tree, keyed like the configuration section of naval_weapons_table.py."""
+    root = Path(root)
+    aces = root / "aces.vromfs.bin_u" / "gamedata"
+    lang = root / "lang.vromfs.bin_u" / "lang"
+    return {
+        "weapons": aces / "weapons" / "navalmodels_weapons",
+        "units": aces / "units" / "ships",
+        "presets": aces / "units" / "ships" / "weaponpresets",
+        "char": root / "char.vromfs.bin_u" / "config",
+        "units_weaponry_csv": lang / "units_weaponry.csv",
+        "units_csv": lang / "units.csv",
+    }
+
+
+def write_blkx(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def make_bullet(rnd, caliber, bullet_type, bullet_name):
+    mass_factor, filler = BULLET_TYPES[bullet_type]
+    # A naval shell weighs roughly 8-15 kg per 1000 cm3 of calibre cubed
+    mass = round(caliber ** 3 * rnd.uniform(8000, 15000) * mass_factor, 2)
+    bullet = {
+        "bulletName": bullet_name,
+        "bulletType": bullet_type,
+        "caliber": caliber,
+        "mass": mass,
+        "speed": round(rnd.uniform(650, 950), 1),
+        "explosiveMass": round(mass * filler * rnd.uniform(0.7, 1.3), 3),
+        "Cx": round(rnd.uniform(0.22, 0.4), 3),
+    }
+    if filler:
+        bullet["fuseDelay"] = rnd.choice([0.0, 0.01, 0.025, 0.035])
+        bullet["explodeTreshold"] = round(caliber * 1000 / rnd.choice([4, 6, 8]), 1)
+    if rnd.random() < 0.8:
+        bullet["damage"] = {"kinetic": {"demarrePenetrationK": rnd.choice([0.9, 1.0, 1.0, 1.0, 1.1])}}
+    return bullet
+
+
+def make_weapon(rnd, index, caliber):
+    """
+    Returns the weapon data and its bullet blocks. Every 10th weapon is not a gun (e.g. a torpedo tube), which the table skips.
+    The default "bullet" is sometimes a list of bullets, as in some of the game files.
+    """
+    bullets = {}
+    for bullet_type in rnd.sample(list(BULLET_TYPES), rnd.randint(1, 4)):
+        key = f"{round(caliber * 1000)}mm_{bullet_type.replace('_tank', '')}_{index}"
+        bullets[key] = {"bullet": make_bullet(rnd, caliber, bullet_type, key)}
+    default_bullet = next(iter(bullets.values()))["bullet"]
+    data = {
+        "weaponType": 3 if index % 10 == 9 else 0,
+        "shotFreq": round(rnd.uniform(0.03, 0.3), 3),
+        "maxDeltaAngle": round(rnd.uniform(0.1, 1.0), 2),
+        "bullet": [dict(default_bullet)] if rnd.random() < 0.2 else dict(default_bullet),
+    }
+    if rnd.random() < 0.5:
+        data["maxDeltaAngleVertical"] = round(rnd.uniform(0.1, 1.0), 2)
+    data.update(bullets)
+    return data, bullets
+
+
+def make_vehicle_cost(rnd, name):
+    """wpcost.blkx entry of a tank or an aircraft, which the table doesn't use but which make up most of the real file."""
+    entry = {f"economicRank{mode}": rnd.randint(0, 40) for mode in ("Arcade", "Historical", "Simulation")}
+    entry.update({"unitClass": rnd.choice(["exp_tank", "exp_fighter", "exp_bomber"]), "value": rnd.randint(1000, 500000)})
+    entry["modifications"] = {f"{name}_mod_{i}": {"value": rnd.randint(100, 10000), "reqExp": rnd.randint(1000, 50000)} for i in range(30)}
+    entry["weapons"] = {f"{name}_weapon_{i}": {"value": rnd.randint(100, 1000)} for i in range(5)}
+    return entry
+
+
+def generate_game_data(root, weapons=200, ships=100, seed=1, wpcost_list=False, other_vehicles=0):
+    """
+    Writes a synthetic game data tree with the given number of weapon files and ships into root and returns its paths (see game_data_paths).
+    Weapon, unit and wpcost files alternate between the dict and the list shapes handled by the parser. The output is deterministic for a seed.
+    If wpcost_list is set, wpcost.blkx is written as a list of entries with a "name" instead of a dict.
+    other_vehicles adds that many tank and aircraft entries to wpcost.blkx, to bring it closer to the size of the real one.
+    """
+    rnd = random.Random(seed)
+    paths = game_data_paths(root)
+    for key in ("weapons", "units", "presets", "char"):
+        paths[key].mkdir(parents=True, exist_ok=True)
+    paths["units_csv"].parent.mkdir(parents=True, exist_ok=True)
+
+    header = ["<ID|readonly|noverify>"] + [f"<{language}>" for language in LANGUAGES]
+    weaponry_rows = [header]
+    weapon_bullets = {}
+    for i in range(weapons):
+        caliber = rnd.choice(CALIBERS)
+        name = f"{round(caliber * 1000)}mm_{rnd.choice(NATIONS)}_gun_{i}"
+        data, bullets = make_weapon(rnd, i, caliber)
+        # Real files are either a single dict or a list of dicts (split into several blocks)
+        if i % 3 == 0:
+            shape = [data]
+        elif i % 3 == 1:
+            items = list(data.items())
+            shape = [dict(items[:3]), dict(items[3:])]
+        else:
+            shape = data
+        write_blkx(paths["weapons"] / f"{name}.blkx", shape)
+        weapon_bullets[name] = list(bullets)
+        weaponry_rows.append([f"weapons/{name}"] + [f"{round(caliber * 1000)} mm/{rnd.randint(40, 60)} Gun {i} ({language})" for language in LANGUAGES])
+        for key in bullets:
+            weaponry_rows.append([key] + [f"{key.split('_')[1].upper()} shell {i} ({language})" for language in LANGUAGES])
+
+    unit_rows = [header]
+    wpcost = {}
+    weapon_names = list(weapon_bullets)
+    for k in range(ships):
+        nation = NATIONS[k % len(NATIONS)]
+        # Event copies (_ec) of the ships are left out of the table
+        unit = f"{nation}_ship_{k}" + ("_ec" if k % 25 == 24 else "")
+        mounted = rnd.sample(weapon_names, min(len(weapon_names), rnd.randint(1, 4)))
+        modifications = {key: {} for weapon in mounted for key in weapon_bullets[weapon][1:] if rnd.random() < 0.7}
+        preset = f"{unit}_default"
+        common_weapons = [{"Weapon": {"blk": f"gameData/Weapons/navalModels_weapons/{weapon}.blk", "trigger": f"gunner{j}"}} for j, weapon in enumerate(mounted)]
+        presets = {"preset": {"name": preset, "blk": f"gameData/units/ships/weaponPresets/{preset}.blk"}}
+        if k % 2:
+            unit_data = {"model": unit, "commonWeapons": common_weapons, "modifications": modifications, "weapon_presets": presets}
+        else:
+            unit_data = [{"model": unit, "commonWeapons": common_weapons}, {"modifications": modifications}, {"weapon_presets": presets}]
+        write_blkx(paths["units"] / f"{unit}.blkx", unit_data)
+        write_blkx(paths["presets"] / f"{preset}.blkx", {"Weapon": [{"blk": f"gameData/Weapons/navalModels_weapons/{mounted[0]}.blk"}]})
+
+        ship_class = rnd.choice(SHIP_CLASSES)
+        unit_rows.append([f"{unit}_0"] + [f"{nation.upper()} Ship number {k} ({language})" for language in LANGUAGES])
+        unit_rows.append([f"{unit}_1"] + [f"{nation.upper()} Ship {k} ({language})" for language in LANGUAGES])
+        unit_rows.append([f"{unit}_2"] + [f"{ship_class} ({language})" for language in LANGUAGES])
+        unit_rows.append([f"shop/group/{unit}"] + [f"Group {k}"] * len(LANGUAGES))
+        wpcost[unit] = {
+            "economicRankArcade": rnd.randint(0, 24),
+            "economicRankHistorical": rnd.randint(0, 24),
+            "economicRankSimulation": rnd.randint(0, 24),
+            "unitClass": f"exp_{ship_class.lower().replace(' ', '_')}",
+            "value": rnd.randint(1000, 500000),
+            "repairCostHistorical": rnd.randint(1000, 30000),
+            "rewardMulHistorical": round(rnd.uniform(0.5, 2.5), 2),
+            "expMul": round(rnd.uniform(1.0, 2.0), 2),
+        }
+    for k in range(other_vehicles):
+        name = f"{NATIONS[k % len(NATIONS)]}_vehicle_{k}"
+        wpcost[name] = make_vehicle_cost(rnd, name)
+    if wpcost_list:
+        write_blkx(paths["char"] / "wpcost.blkx", [{"name": name, **entry} for name, entry in wpcost.items()])
+    else:
+        write_blkx(paths["char"] / "wpcost.blkx", {"economicRankMax": 24, **wpcost})
+
+    for path, rows in ((paths["units_weaponry_csv"], weaponry_rows), (paths["units_csv"], unit_rows)):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f, delimiter=';').writerows(rows)
+    return paths
+
+
+def use_game_data(module, paths):
+    """Points the configuration section of naval_weapons_table (passed as module) at a generated tree."""
+    module.UNITS_WEAPONRY_CSV = str(paths["units_weaponry_csv"])
+    module.UNITS_CSV = str(paths["units_csv"])
+    module.CHAR_CONFIG = str(paths["char"])
+    module.WEAPONSPRESETS = str(paths["presets"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic unpacked game data tree for naval_weapons_table.py.")
+    parser.add_argument('root', help="Folder to write the tree into")
+    parser.add_argument('--weapons', type=int, default=200, help="Number of weapon files")
+    parser.add_argument('--ships', type=int, default=100, help="Number of ships")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed, the same seed gives the same tree")
+    parser.add_argument('--vehicles', type=int, default=0, help="Number of tanks and aircraft added to wpcost.blkx")
+    parser.add_argument('--wpcost-list', action='store_true', help="Write wpcost.blkx as a list of entries instead of a dict")
+    args = parser.parse_args()
+
+    paths = generate_game_data(args.root, args.weapons, args.ships, args.seed, args.wpcost_list, args.vehicles)
+    print(f"Generated {args.weapons} weapons and {args.ships} ships in {os.path.abspath(args.root)}")
+    print(f"--weaponspath \"{paths['weapons']}\" --unitspath \"{paths['units']}\"")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import json
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Local HTTP JSON API over the naval weapons table, started with: python naval_weapons_table.py (...) --serve 8000
+# The shells are parsed once and then kept in memory with indexes for the common filters.
+#
+# GET /meta    - columns, bullet types and nations that can be used in the filters
+# GET /shells  - filtered, sorted and paginated rows. Parameters (all optional):
+#   from, to          calibre range in millimeters
+#   type              bullet types, comma-separated (e.g. APCBC,SAP)
+#   nation            nations, comma-separated (prefix of the unit names, e.g. us,germ,uk)
+#   br_min, br_max    only shells used by at least one ship within the BR window
+#   min_pen           minimum Jacob de Marre penetration
+#   sort, order       column to sort by (default caliber_mm) and asc/desc
+#   offset, limit     pagination (default 0 and 100, limit up to MAX_LIMIT), both must not be negative
+# With --ranges the pen_<distance>m and tof_<distance>m columns are included in the rows and can be sorted by.
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 5000
+
+logger = logging.getLogger("naval_weapons_table.server")
+
+
+def unit_nation(unit_name):
+    return unit_name.split('_', 1)[0]
+
+
+class ShellDataset:
+    """
+    In-memory shells with the indexes used by the queries: sorted calibres, bullet types and nations.
+    format_record and columns come from naval_weapons_table, so the names get translated the same way as in the json output.
+    """
+    def __init__(self, shells, format_record, columns):
+        self.columns = columns
+        self.rows = []
+        self.by_type = defaultdict(set)
+        self.by_nation = defaultdict(set)
+        for i, shell in enumerate(shells):
+            record = format_record(shell, 'json')
+            row = {key: record[key] for key, _ in columns if key not in ("ships", "battle_ratings", "ship_types")}
+            row["ships"] = [
+                {"unit": unit, "name": name, "battle_rating": br, "type": stype}
+                for unit, name, br, stype in zip(shell["units"], record["ships"], shell["unit_battle_ratings"], record["ship_types"])
+            ]
+            row["nations"] = sorted({unit_nation(unit) for unit in shell["units"]})
+            self.rows.append(row)
+            self.by_type[row["bullet_type"]].add(i)
+            for nation in row["nations"]:
+                self.by_nation[nation].add(i)
+        self.by_caliber = sorted((row["caliber_mm"], i) for i, row in enumerate(self.rows))
+        self.calibers = [caliber for caliber, _ in self.by_caliber]
+        self.sort_orders = {}
+
+    def sorted_indexes(self, column):
+        """Row indexes sorted by the column, computed on the first use of each column."""
+        if column not in self.sort_orders:
+            def sort_key(i):
+                value = self.rows[i].get(column)
+                return (0, value, i) if isinstance(value, (int, float)) else (1, str(value), i)
+            self.sort_orders[column] = sorted(range(len(self.rows)), key=sort_key)
+        return self.sort_orders[column]
+
+    def query(self, caliber_from=None, caliber_to=None, types=None, nations=None, br_min=None, br_max=None, min_pen=None,
+              sort="caliber_mm", descending=False, offset=0, limit=DEFAULT_LIMIT):
+        candidates = None
+        if caliber_from is not None or caliber_to is not None:
+            start = bisect_left(self.calibers, caliber_from) if caliber_from is not None else 0
+            end = bisect_right(self.calibers, caliber_to) if caliber_to is not None else len(self.calibers)
+            candidates = {i for _, i in self.by_caliber[start:end]}
+        for values, index in ((types, self.by_type), (nations, self.by_nation)):
+            if values:
+                matching = set().union(*(index.get(value, set()) for value in values))
+                candidates = matching if candidates is None else candidates & matching
+
+        def matches(i):
+            row = self.rows[i]
+            if min_pen is not None and row["jacob_de_marre"] < min_pen:
+                return False
+            if br_min is not None or br_max is not None:
+                return any(
+                    ship["battle_rating"] is not None
+                    and (br_min is None or ship["battle_rating"] >= br_min)
+                    and (br_max is None or ship["battle_rating"] <= br_max)
+                    for ship in row["ships"]
+                )
+            return True
+
+        order = self.sorted_indexes(sort)
+        if descending:
+            order = reversed(order)
+        selected = [i for i in order if (candidates is None or i in candidates) and matches(i)]
+        return len(selected), [self.rows[i] for i in selected[offset:offset + limit]]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    dataset = None
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/meta":
+            self.send_json(200, {
+                "columns": [{"key": key, "header": header} for key, header in self.dataset.columns],
+                "bullet_types": sorted(str(t) for t in self.dataset.by_type),
+                "nations": sorted(self.dataset.by_nation),
+                "count": len(self.dataset.rows),
+            })
+        elif url.path == "/shells":
+            try:
+                def number(name):
+                    return float(params[name]) if params.get(name) else None
+
+                def values(name):
+                    return [value for value in params.get(name, "").split(',') if value]
+
+                sort = params.get("sort", "caliber_mm")
+                if sort not in {key for key, _ in self.dataset.columns}:
+                    raise ValueError(f"unknown sort column {sort}")
+                offset = int(params.get("offset", 0))
+                limit = min(int(params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+                if offset < 0 or limit < 0:
+                    raise ValueError("offset and limit must not be negative")
+                total, rows = self.dataset.query(
+                    number("from"), number("to"), values("type"), values("nation"), number("br_min"), number("br_max"),
+                    number("min_pen"), sort, params.get("order") == "desc", offset, limit
+                )
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            self.send_json(200, {"total": total, "offset": offset, "limit": limit, "rows": rows})
+        else:
+            self.send_json(404, {"error": "not found, use /meta or /shells"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(shells, port, format_record, columns, host="127.0.0.1"):
+    """Loads the shells into memory and answers the queries until interrupted with Ctrl+C. Port 0 picks a free port."""
+    QueryHandler.dataset = ShellDataset(shells, format_record, columns)
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    logger.info(f"Serving {len(QueryHandler.dataset.rows)} shells on http://{host}:{server.server_port}/shells (press Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,11 +1,27 @@
 import os
+import sys
 import json
+import math
 import subprocess
 import csv
+import hashlib
+import mmap
+import re
+import sqlite3
 import argparse
+import logging
+import cProfile
+import time
+import tracemalloc
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, fields
+from functools import wraps
+from typing import Dict, List, Optional
 
 # How to update:
 # remove folders 
@@ -20,16 +36,51 @@ from collections import defaultdict
 
 # Paths to files and scripts
 BLK_UNPACK_SCRIPT = "blk_unpack_ng.py"
+VROMFS_UNPACK_SCRIPT = "vromfs_unpacker.py" # used by --watch to unpack the updated game archives
 UNITS_WEAPONRY_CSV = r"$LOCALAPPDATA\WarThunder\lang.vromfs.bin_u\lang\units_weaponry.csv"
 UNITS_CSV = r"$LOCALAPPDATA\WarThunder\lang.vromfs.bin_u\lang\units.csv"
 CHAR_CONFIG = r"$LOCALAPPDATA\WarThunder\char.vromfs.bin_u\config"
 WEAPONSPRESETS = r"$LOCALAPPDATA\WarThunder\aces.vromfs.bin_u\gamedata\units\ships\weaponpresets"
 
+# Compiled translation index, saved next to units.csv and rebuilt whenever the lang files change
+TRANSLATIONS_CACHE = "translations_cache.sqlite3"
+TRANSLATIONS_LANGUAGE = "English" # name of the column in the lang csv files, e.g. English, French, German, Russian
+
+# Sidecar index of the weapon files, stored inside the weapons folder. Delete it to force a full rebuild
+WEAPON_INDEX_FILE = "weapon_index.json"
+WEAPON_INDEX_VERSION = 2
+# Index of the ship files (weapons, modifications, presets and BRs), stored inside the units folder
+UNIT_INDEX_FILE = "unit_index.json"
+UNIT_INDEX_VERSION = 3
+
+# Game mode of the BRs shown in the table: arcade, realistic or simulator
+GAME_MODE = "realistic"
+GAME_MODES = {"arcade": "Arcade", "realistic": "Historical", "simulator": "Simulation"} # suffixes of the economicRank fields in wpcost.blkx
+# Fields of wpcost.blkx saved in the unit index for every ship
+ECONOMY_FIELDS = [f"economicRank{suffix}" for suffix in GAME_MODES.values()] + ["unitClass"]
+# Initial size (in bytes) of the window decoded for each unit read selectively from wpcost.blkx, enlarged when an entry doesn't fit
+WPCOST_ENTRY_WINDOW = 64 * 1024
+
+# Default number of seconds between the checks for game updates of --watch
+WATCH_INTERVAL = 30
+
+# Number of shells computed at once by the batch ballistics of --ranges
+RANGE_BATCH_SIZE = 512
+
+# Number of rows buffered per table before the parquet output writes them as a row group
+PARQUET_ROW_GROUP_SIZE = 65536
+
 # CSV format settings
 CSV_LISTSEPARATOR = ', ' # This is a separator for the for the ships, BRs and the ship classes list. Include spacing and make it different than CSV_DELIMITER
 CSV_DELIMITER = ';'
 CSV_LINETERMINATOR = '\n'
 
+# Output formats that get the plain names, without wiki links or HTML markup
+PLAIN_TEXT_FORMATS = ['json', 'csv', 'tabledata', 'sqlite', 'parquet']
+
+# Messages about the progress and the files that couldn't be read. The command line prints them, library users can configure logging
+logger = logging.getLogger("naval_weapons_table")
+
 # Flag to bypass formatting names to human-readable format
 RAW_NAMES = False
 weapon_name_translation_dict = {}
@@ -37,41 +88,198 @@ bullet_name_translation_dict = {}
 unit_name_translation_dict = {}
 unit_type_translation_dict = {}
 
-def load_translations():
-    weapon_name_translation_dict = {}
-    bullet_name_translation_dict = {}
-    unit_name_translation_dict = {}
-    unit_type_translation_dict = {}
+# Stage timings collected with --timings (see Timings), None when disabled
+TIMINGS = None
+
+
+class Timings:
+    """
+    Wall time, number and size of the files read, and peak memory (traced by tracemalloc) of each stage of a run.
+    Nested stages are measured separately, e.g. the time of "load_br_values" isn't counted again in "build_unit_index".
+    """
+    def __init__(self):
+        self.stages = {}
+        self.stack = []
+        tracemalloc.start()
+
+    def entry(self, name):
+        return self.stages.setdefault(name, {"time": 0.0, "calls": 0, "files": 0, "bytes": 0, "peak": 0})
+
+    def checkpoint(self):
+        """Adds the time and the memory peak since the last checkpoint to the stages that are running."""
+        now = time.perf_counter()
+        _, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            name, start = self.stack[-1]
+            self.entry(name)["time"] += now - start
+            self.stack[-1][1] = now
+        for name, _ in self.stack:
+            stage = self.entry(name)
+            stage["peak"] = max(stage["peak"], peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        return now
+
+    @contextmanager
+    def stage(self, name, call=True):
+        """Measures the block as the stage. call=False adds the block to the last call instead of counting a new one."""
+        now = self.checkpoint()
+        if call:
+            self.entry(name)["calls"] += 1
+        self.stack.append([name, now])
+        try:
+            yield
+        finally:
+            self.checkpoint()
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1] = time.perf_counter()
+
+    def file_read(self, path, size=None):
+        stage = self.entry(self.stack[-1][0] if self.stack else "other")
+        stage["files"] += 1
+        stage["bytes"] += os.path.getsize(path) if size is None else size
+
+    def report(self, stream=sys.stderr):
+        stream.write(f"{'Stage':<32} {'Time (s)':>9} {'Calls':>7} {'Files':>7} {'Read (MB)':>10} {'Peak mem (MB)':>14}\n")
+        for name, stage in self.stages.items():
+            stream.write(f"{name:<32} {stage['time']:>9.3f} {stage['calls']:>7} {stage['files']:>7} {stage['bytes'] / 2**20:>10.2f} {stage['peak'] / 2**20:>14.2f}\n")
+        total = sum(stage["time"] for stage in self.stages.values())
+        stream.write(f"{'Total':<32} {total:>9.3f} {'':>7} {sum(s['files'] for s in self.stages.values()):>7} {sum(s['bytes'] for s in self.stages.values()) / 2**20:>10.2f}\n")
+
+def timed(name, call=True):
+    """Context manager measuring a stage when --timings is on, see Timings.stage."""
+    return TIMINGS.stage(name, call) if TIMINGS else nullcontext()
+
+def timed_stage(name):
+    """Decorator measuring every call of the function as a stage when --timings is on."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timed_iter(name, iterable):
+    """
+    Measures the time spent producing the items of a (lazy) iterable as a stage, apart from the time spent consuming them.
+    The whole iteration counts as one call of the stage.
+    """
+    iterator = iter(iterable)
+    first = True
+    while True:
+        with timed(name, call=first):
+            first = False
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def count_read(path, size=None):
+    """Records a file read by the current stage when --timings is on. size is the number of bytes read if it wasn't the whole file."""
+    if TIMINGS:
+        TIMINGS.file_read(path, size)
+
+class TranslationTable:
+    """
+    Dict-like, read-only view of one kind of translations in the compiled translation index.
+    Keys are looked up in the database on first use and remembered, so only the names that get displayed are loaded.
+    """
+    def __init__(self, connection, kind):
+        self.connection = connection
+        self.kind = kind
+        self.cache = {}
+
+    def get(self, key, default=None):
+        if key not in self.cache:
+            row = self.connection.execute("SELECT value FROM translations WHERE kind = ? AND key = ?", (self.kind, key)).fetchone()
+            self.cache[key] = row[0] if row else None
+        value = self.cache[key]
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+def find_language_column(header, language=None):
+    """Index of the language (TRANSLATIONS_LANGUAGE by default) column in the header row of a lang csv, the first language column if it isn't there."""
+    language = TRANSLATIONS_LANGUAGE if language is None else language
+    for i, cell in enumerate(header):
+        if cell.strip('<>') == language:
+            return i
+    return 1
+
+def iter_translation_rows(units_weaponry_csv, units_csv, language=None):
+    """Yields (kind, key, value) for every translation of the chosen language that the table can display."""
     name_to_display = '_1' # 0 - long, 1 - short, 2 - type
     type_to_display = '_2' # 0 - long, 1 - short, 2 - type
-    if os.path.exists(UNITS_WEAPONRY_CSV):
-        with open(UNITS_WEAPONRY_CSV, mode='r', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile, delimiter=';')
-            for row in reader:
-                if len(row) >= 2:
-                    key, value = row[0], row[1]
-                    if key.startswith("weapons/"):
-                        weapon_name_translation_dict[key.replace('weapons/', '')] = value
-                    else:
-                        bullet_name_translation_dict[key] = value
-    else:
-        print("Failed to find units_weaponry.csv in UNITS_WEAPONRY_CSV path!")
-        exit(1)
-    if os.path.exists(UNITS_CSV):
-        with open(UNITS_CSV, mode='r', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile, delimiter=';')
-            for row in reader:
-                if len(row) >= 2:
-                    key, value = row[0], row[1]
-                    if "/" not in key and name_to_display in key:
-                        unit_name_translation_dict[key[:-2] if key.endswith(name_to_display) else key] = value
-                    if "/" not in key and type_to_display in key:
-                        unit_type_translation_dict[key[:-2] if key.endswith(type_to_display) else key] = value
-    else:
-        print("Failed to find units.csv in UNITS_CSV path!")
-        exit(1)
-
-    return weapon_name_translation_dict, bullet_name_translation_dict, unit_name_translation_dict, unit_type_translation_dict
+    count_read(units_weaponry_csv)
+    with open(units_weaponry_csv, mode='r', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile, delimiter=';')
+        column = find_language_column(next(reader, []), language)
+        for row in reader:
+            if len(row) > column:
+                key, value = row[0], row[column]
+                if key.startswith("weapons/"):
+                    yield "weapon", key.replace('weapons/', ''), value
+                else:
+                    yield "bullet", key, value
+    count_read(units_csv)
+    with open(units_csv, mode='r', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile, delimiter=';')
+        column = find_language_column(next(reader, []), language)
+        for row in reader:
+            if len(row) > column:
+                key, value = row[0], row[column]
+                if "/" not in key and name_to_display in key:
+                    yield "unit_name", key[:-2] if key.endswith(name_to_display) else key, value
+                if "/" not in key and type_to_display in key:
+                    yield "unit_type", key[:-2] if key.endswith(type_to_display) else key, value
+
+def open_translation_index(units_weaponry_csv=None, units_csv=None, language=None):
+    """
+    Opens the compiled translation index (TRANSLATIONS_CACHE, next to units.csv), rebuilding it when the game files
+    or the chosen language changed. Only the column of the language (TRANSLATIONS_LANGUAGE by default) is stored.
+    The csv files default to UNITS_WEAPONRY_CSV and UNITS_CSV.
+    """
+    units_weaponry_csv = UNITS_WEAPONRY_CSV if units_weaponry_csv is None else units_weaponry_csv
+    units_csv = UNITS_CSV if units_csv is None else units_csv
+    language = TRANSLATIONS_LANGUAGE if language is None else language
+    signature = json.dumps([language] + [[os.path.getmtime(path), os.path.getsize(path)] for path in (units_weaponry_csv, units_csv)])
+    cache_path = Path(units_csv).with_name(TRANSLATIONS_CACHE)
+    try:
+        connection = sqlite3.connect(str(cache_path), check_same_thread=False)
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (signature TEXT)")
+    except sqlite3.Error as e:
+        logger.warning(f"Could not open the translation index {cache_path}: {e}")
+        connection = sqlite3.connect(":memory:", check_same_thread=False)
+        connection.execute("CREATE TABLE meta (signature TEXT)")
+
+    row = connection.execute("SELECT signature FROM meta").fetchone()
+    if row is None or row[0] != signature:
+        connection.execute("DROP TABLE IF EXISTS translations")
+        connection.execute("CREATE TABLE translations (kind TEXT, key TEXT, value TEXT, PRIMARY KEY (kind, key)) WITHOUT ROWID")
+        connection.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?)", iter_translation_rows(units_weaponry_csv, units_csv, language))
+        connection.execute("DELETE FROM meta")
+        connection.execute("INSERT INTO meta VALUES (?)", (signature,))
+        connection.commit()
+    return connection
+
+@timed_stage("load_translations")
+def load_translations(units_weaponry_csv=None, units_csv=None, language=None):
+    """
+    Returns the weapon name, bullet name, unit name and unit type translations (as TranslationTables).
+    Raises FileNotFoundError if the lang csv files (UNITS_WEAPONRY_CSV and UNITS_CSV by default) are missing.
+    """
+    units_weaponry_csv = UNITS_WEAPONRY_CSV if units_weaponry_csv is None else units_weaponry_csv
+    units_csv = UNITS_CSV if units_csv is None else units_csv
+    if not os.path.exists(units_weaponry_csv):
+        raise FileNotFoundError("Failed to find units_weaponry.csv in UNITS_WEAPONRY_CSV path!")
+    if not os.path.exists(units_csv):
+        raise FileNotFoundError("Failed to find units.csv in UNITS_CSV path!")
+    connection = open_translation_index(units_weaponry_csv, units_csv, language)
+    return tuple(TranslationTable(connection, kind) for kind in ("weapon", "bullet", "unit_name", "unit_type"))
 
 weapon_name_wiki_correction = {
     "38 cm/52 SK C/34 (380 mm)": "SK L/45 (380 mm)",
@@ -120,164 +328,384 @@ bullet_type_is_de_marre_apcbc = {
 }
 
 
-def translate_weapon_name(weapon_name, caliber_value, output_format='wikitext'):
-    if RAW_NAMES:
-        return weapon_name
-    name = weapon_name_translation_dict.get(weapon_name, weapon_name)
-    name = name.replace(' cannon', '').replace(' gun', '').replace(', ', ' ')
-    link = f"{name} ({caliber_value} mm)"
-    wikiname = weapon_name_wiki_correction.get(link, link) # this is relevant only for the old-wiki.warthunder.com, link slugs on the wiki 3.0 are defined manually by the wiki community moderators, so this approach does not work there
-    if output_format == 'html':
-        return f'<span title="{weapon_name}">{name}</span>'
-    elif output_format in ['json', 'csv']:
-        return name
-    return f"[[{wikiname}|{name}]]"
+class Translator:
+    """
+    Turns the raw file, bullet and unit names into the displayed ones for an output format: wiki links for wikitext,
+    tooltips for html and plain names for the other formats. With raw_names the names are left untranslated.
+    """
+    def __init__(self, weapon_names=None, bullet_names=None, unit_names=None, unit_types=None, raw_names=False):
+        self.weapon_names = {} if weapon_names is None else weapon_names
+        self.bullet_names = {} if bullet_names is None else bullet_names
+        self.unit_names = {} if unit_names is None else unit_names
+        self.unit_types = {} if unit_types is None else unit_types
+        self.raw_names = raw_names
+
+    @classmethod
+    def load(cls, units_weaponry_csv=None, units_csv=None, language=None, raw_names=False):
+        """Translator of the lang csv files (see load_translations). Nothing is loaded with raw_names."""
+        if raw_names:
+            return cls(raw_names=True)
+        return cls(*load_translations(units_weaponry_csv, units_csv, language))
+
+    def weapon_name(self, weapon_name, caliber_value, output_format='wikitext'):
+        if self.raw_names:
+            return weapon_name
+        name = self.weapon_names.get(weapon_name, weapon_name)
+        name = name.replace(' cannon', '').replace(' gun', '').replace(', ', ' ')
+        link = f"{name} ({caliber_value} mm)"
+        wikiname = weapon_name_wiki_correction.get(link, link) # this is relevant only for the old-wiki.warthunder.com, link slugs on the wiki 3.0 are defined manually by the wiki community moderators, so this approach does not work there
+        if output_format == 'html':
+            return f'<span title="{weapon_name}">{name}</span>'
+        elif output_format in PLAIN_TEXT_FORMATS:
+            return name
+        return f"[[{wikiname}|{name}]]"
+
+    def bullet_name(self, bullet_name, output_format='wikitext'):
+        if self.raw_names:
+            return bullet_name
+        if output_format == 'html':
+            return f'<span title="{bullet_name}">{self.bullet_names.get(bullet_name, bullet_name)}</span>'
+        return self.bullet_names.get(bullet_name, bullet_name)
+
+    def unit_name(self, unit_name, output_format='wikitext'):
+        if self.raw_names:
+            return unit_name
+        translated = self.unit_names.get(unit_name, unit_name)
+        if output_format == 'html':
+            return f'<a href="https://wiki.warthunder.com/unit/{unit_name}" title="{unit_name}">{translated}</a>'
+        elif output_format in PLAIN_TEXT_FORMATS:
+            return translated
+        return f"[[{translated}]]"
+
+    def unit_type(self, unit_name, output_format='wikitext'):
+        if output_format == 'html':
+            return self.unit_types.get(unit_name, f"{unit_name} is unknown").replace(' ', '&nbsp;') #\u00A0
+        return self.unit_types.get(unit_name, f"{unit_name} is unknown")
+
+    def format_record(self, shell, output_format):
+        """Translates the names of a shell record for the given output format. Returns the table row as a dict."""
+        record = dict(shell)
+        record["weapon"] = self.weapon_name(shell["weapon"], shell["caliber_mm"], output_format)
+        record["bullet_name"] = self.bullet_name(shell["bullet_name"], output_format)
+        record["ships"] = [self.unit_name(u, output_format) for u in shell["units"]]
+        record["ship_types"] = [self.unit_type(u, output_format) for u in shell["units"]]
+        return record
+
+# The functions below translate with the module-level RAW_NAMES and translation dicts, as set up by older scripts
+_module_translator = None
+
+def module_translator():
+    """
+    Translator of the module-level dicts and RAW_NAMES. It shares the dicts, so changes made to them in place show up;
+    a new one is built only when RAW_NAMES or one of the dicts is reassigned.
+    """
+    global _module_translator
+    tables = (weapon_name_translation_dict, bullet_name_translation_dict, unit_name_translation_dict, unit_type_translation_dict)
+    translator = _module_translator
+    if translator is None or translator.raw_names != RAW_NAMES or \
+            any(current is not table for current, table in zip((translator.weapon_names, translator.bullet_names, translator.unit_names, translator.unit_types), tables)):
+        _module_translator = Translator(*tables, RAW_NAMES)
+    return _module_translator
 
+def translate_weapon_name(weapon_name, caliber_value, output_format='wikitext'):
+    return module_translator().weapon_name(weapon_name, caliber_value, output_format)
 
 def translate_bullet_name(bullet_name, output_format='wikitext'):
-    if RAW_NAMES:
-        return bullet_name
-    if output_format == 'html':
-        return f'<span title="{bullet_name}">{bullet_name_translation_dict.get(bullet_name, bullet_name)}</span>'
-    return bullet_name_translation_dict.get(bullet_name, bullet_name)
-
+    return module_translator().bullet_name(bullet_name, output_format)
 
 def translate_unit_name(unit_name, output_format='wikitext'):
-    if RAW_NAMES:
-        return unit_name
-    translated = unit_name_translation_dict.get(unit_name, unit_name)
-    if output_format == 'html':
-        return f'<a href="https://wiki.warthunder.com/unit/{unit_name}" title="{unit_name}">{translated}</a>'
-    elif output_format in ['json', 'csv']:
-        return translated
-    return f"[[{translated}]]"
+    return module_translator().unit_name(unit_name, output_format)
 
 def translate_unit_type(unit_name, output_format='wikitext'):
-    if output_format == 'html':
-        return unit_type_translation_dict.get(unit_name, f"{unit_name} is unknown").replace(' ', '&nbsp;') #\u00A0
-    return unit_type_translation_dict.get(unit_name, f"{unit_name} is unknown")
+    return module_translator().unit_type(unit_name, output_format)
 
-def unpack_blk_file(blk_file):
+def unpack_blk_file(blk_file, force=False):
     blkx_file = blk_file.with_suffix(".blkx")
-    if not blkx_file.exists():
-        print(f"Unpacking {blk_file} to {blkx_file}")
+    if force or not blkx_file.exists():
+        logger.info(f"Unpacking {blk_file} to {blkx_file}")
         subprocess.run(["python", BLK_UNPACK_SCRIPT, str(blk_file)])
 
 
+@timed_stage("unpack_blk_files")
 def unpack_blk_files(folder_path):
     blk_files = list(Path(folder_path).glob("*.blk"))
     with ThreadPoolExecutor(max_workers=5) as executor:
         executor.map(unpack_blk_file, blk_files)
 
 
-def build_ship_weapon_map(units_folder, output_format='wikitext'):
-    ship_map = defaultdict(list)
-    ship_type_map = {}  # Map unit name to ship type
-
-    def find_weapon_blks(obj):
-        stems = []
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                if k.lower() == 'blk' and isinstance(v, str):
-                    stems.append(Path(v).stem)
-                elif isinstance(v, str) and v.lower().endswith('.blk'):
-                    stems.append(Path(v).stem)
-                else:
-                    stems.extend(find_weapon_blks(v))
-        elif isinstance(obj, list):
-            for item in obj:
-                stems.extend(find_weapon_blks(item))
-        return stems
-
-    for unit_file in Path(units_folder).glob("*.blkx"):
-        try:
-            with open(unit_file, 'r', encoding='utf-8') as f:
-                raw = json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON in unit file: {unit_file}")
-            continue
-
-        # Store the ship type for this unit
-        unit_name = unit_file.stem
-        ship_type = translate_unit_type(unit_name, output_format)
-        ship_type_map[unit_name] = ship_type
-
-        items = raw if isinstance(raw, list) else [raw]
-        stems = set()
-        for item in items:
-            stems.update(find_weapon_blks(item))
-        for stem in stems:
-            ship_map[stem].append(unit_name)
-
-    return ship_map, ship_type_map
+def find_blk_references(obj):
+    """Recursively collects the paths of all .blk files referenced in a decoded blkx structure."""
+    references = []
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if k.lower() == 'blk' and isinstance(v, str):
+                references.append(v)
+            elif isinstance(v, str) and v.lower().endswith('.blk'):
+                references.append(v)
+            else:
+                references.extend(find_blk_references(v))
+    elif isinstance(obj, list):
+        for item in obj:
+            references.extend(find_blk_references(item))
+    return references
+
+def load_json_index(index_path, version):
+    """Loads a sidecar index saved by save_json_index. Returns an empty dict if it's missing, corrupted or outdated."""
+    if not index_path.exists():
+        return {}
+    try:
+        count_read(index_path)
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if isinstance(index, dict) and index.get("version") == version:
+            return index
+    except (json.JSONDecodeError, IOError):
+        logger.warning(f"Index {index_path} is corrupted, rebuilding it")
+    return {}
+
+def save_json_index(index_path, index):
+    try:
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+    except IOError as e:
+        logger.warning(f"Could not save the index {index_path}: {e}")
+
+def update_file_entries(files, entries, index_file, reuse=None):
+    """
+    Refreshes the per-file index entries: files that are new or whose mtime/size changed get hashed, and only those whose
+    sha1 changed too are re-indexed with index_file(path) (a game update re-unpacks every file, but changes few of them).
+    reuse optionally holds the entries of another tree (e.g. the previous game version), taken over for the files with the same sha1.
+    Entries of the removed files are dropped. Returns the new entries (keyed by file name) and whether anything changed.
+    """
+    by_sha1 = {entry["sha1"]: entry for entry in (reuse or {}).values() if "sha1" in entry}
+    changed = False
+    current = {}
+    for path in files:
+        entry = entries.get(path.name)
+        stat = path.stat()
+        if entry is None or entry.get("mtime") != stat.st_mtime or entry.get("size") != stat.st_size:
+            count_read(path)
+            sha1 = hashlib.sha1(path.read_bytes()).hexdigest()
+            known = entry if entry is not None and entry.get("sha1") == sha1 else by_sha1.get(sha1)
+            entry = dict(known) if known is not None else index_file(path)
+            entry["mtime"], entry["size"], entry["sha1"] = stat.st_mtime, stat.st_size, sha1
+            changed = True
+        current[path.name] = entry
+    return current, changed or len(current) != len(entries)
+
+def read_unit_data(unit_file):
+    count_read(unit_file)
+    with open(unit_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    unit_data = {}
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict):
+                unit_data.update(item)
+    elif isinstance(data, dict):
+        unit_data = data
+    return unit_data
+
+def index_unit_file(unit_file):
+    """Index entry of a unit: the weapon files from commonWeapons, the modifications and the weapon presets it references."""
+    entry = {"weapons": [], "modifications": [], "presets": []}
+    try:
+        unit_data = read_unit_data(unit_file)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.warning(f"Could not read or parse {unit_file}: {e}")
+        return entry
+
+    # Map weapons from commonWeapons using only the filename as the key
+    if 'commonWeapons' in unit_data and isinstance(unit_data['commonWeapons'], list):
+        for weapon_entry in unit_data['commonWeapons']:
+            if isinstance(weapon_entry, dict) and 'Weapon' in weapon_entry:
+                weapon_details = weapon_entry['Weapon']
+                if 'blk' in weapon_details:
+                    entry["weapons"].append(Path(weapon_details['blk']).name)
+
+    if 'modifications' in unit_data and isinstance(unit_data['modifications'], dict):
+        entry["modifications"] = list(unit_data['modifications'].keys())
+
+    entry["presets"] = sorted({Path(blk).stem for blk in find_blk_references(unit_data.get('weapon_presets', {}))})
+    return entry
+
+def index_preset_file(preset_file):
+    """Index entry of a weapon preset: the names of the weapon files it mounts."""
+    try:
+        count_read(preset_file)
+        with open(preset_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.warning(f"Could not read or parse {preset_file}: {e}")
+        return {"weapons": []}
+    return {"weapons": sorted({Path(blk).name for blk in find_blk_references(data)})}
+
+@timed_stage("build_unit_index")
+def build_unit_index(units_folder, presets_folder=None, char_config=None, game_mode=None, reuse=None):
+    """
+    Reads every unit file (and weapon preset) once and builds a combined inverted index:
+    - "weapons": weapon filename -> units that have it in commonWeapons or mounted by one of their weapon presets
+    - "modifications": modification name -> units that have it
+    - "presets": preset name -> weapon filenames mounted by the preset
+    - "units": unit name -> {"br", "class", "economy", "presets", "weapons", "modifications", "sha1"}, with the ECONOMY_FIELDS read from wpcost.blkx
+      ("br" is the economic rank of GAME_MODE, "class" the unit class, "weapons" the weapon files of commonWeapons and of the presets)
+    - "files": {"units": ..., "presets": ...}, the per-file index entries by file name
+    presets_folder, char_config and game_mode default to WEAPONSPRESETS, CHAR_CONFIG and GAME_MODE. The per-file results are saved to UNIT_INDEX_FILE in the units folder and reused until the files change.
+    reuse optionally holds the "files" of another unit index (e.g. of the previous game version), taken over for identical files (see update_file_entries).
+    """
+    unit_index = {"weapons": defaultdict(list), "modifications": defaultdict(list), "presets": {}, "units": {}, "files": {"units": {}, "presets": {}}}
+    if not units_folder or not Path(units_folder).exists():
+        logger.warning(f"Warning: Units folder '{units_folder}' not found. Cannot map ships to weapons.")
+        return unit_index
+
+    presets_folder = WEAPONSPRESETS if presets_folder is None else presets_folder
+    index_path = Path(units_folder) / UNIT_INDEX_FILE
+    saved = load_json_index(index_path, UNIT_INDEX_VERSION)
+
+    reuse = reuse or {}
+    units, units_changed = update_file_entries(Path(units_folder).glob("*.blkx"), saved.get("units", {}), index_unit_file, reuse.get("units"))
+    presets, presets_changed = update_file_entries(Path(presets_folder).glob("*.blkx"), saved.get("presets", {}), index_preset_file, reuse.get("presets"))
+    unit_index["files"] = {"units": units, "presets": presets}
+
+    economy = saved.get("economy", {})
+    char_config = CHAR_CONFIG if char_config is None else char_config
+    cost_file = Path(char_config) / "wpcost.blkx"
+    cost_stat = cost_file.stat() if cost_file.exists() else None
+    cost_signature = [cost_stat.st_mtime, cost_stat.st_size] if cost_stat else None
+    economy_changed = units_changed or economy.get("signature") != cost_signature
+    if economy_changed:
+        unit_names = {Path(name).stem for name in units}
+        economy = {"signature": cost_signature, "units": {}}
+        with timed("load_br_values"):
+            economy["units"] = load_wpcost_fields(unit_names, ECONOMY_FIELDS, char_config)
+
+    if units_changed or presets_changed or economy_changed:
+        save_json_index(index_path, {"version": UNIT_INDEX_VERSION, "units": units, "presets": presets, "economy": economy})
+
+    for preset_name, entry in presets.items():
+        unit_index["presets"][Path(preset_name).stem] = entry["weapons"]
+    for unit_filename, entry in units.items():
+        unit_name = Path(unit_filename).stem
+        unit_weapons = list(entry["weapons"])
+        for preset_name in entry["presets"]:
+            unit_weapons.extend(name for name in unit_index["presets"].get(preset_name, []) if name not in unit_weapons)
+        for weapon_filename in unit_weapons:
+            unit_index["weapons"][weapon_filename].append(unit_name)
+        for mod_name in entry["modifications"]:
+            unit_index["modifications"][mod_name].append(unit_name)
+        unit_economy = economy["units"].get(unit_name, {})
+        unit_index["units"][unit_name] = {
+            "br": unit_economy.get(economic_rank_field(game_mode)), "class": unit_economy.get("unitClass"), "economy": unit_economy, "presets": entry["presets"],
+            "weapons": unit_weapons, "modifications": entry["modifications"], "sha1": entry["sha1"]
+        }
+    return unit_index
 
 def build_ship_and_mod_maps(units_folder):
     """
-    Parses all unit files to build two maps:
+    Returns two maps from the unit index:
     1. A map from a weapon's filename to the list of ships that use it.
     2. A map from a modification name to the list of ships that have it.
     """
-    ship_weapon_map = defaultdict(list)
-    ship_mod_map = defaultdict(list)
-
-    if not units_folder or not Path(units_folder).exists():
-        print(f"Warning: Units folder '{units_folder}' not found. Cannot map ships to weapons.")
-        return ship_weapon_map, ship_mod_map
+    unit_index = build_unit_index(units_folder)
+    return unit_index["weapons"], unit_index["modifications"]
 
-    for unit_file in Path(units_folder).glob("*.blkx"):
+def load_wpcost_entries(char_config=None):
+    """Yields (unit name, economy entry) pairs from wpcost.blkx, which can be either a dict or a list of entries."""
+    for cost_file in Path(CHAR_CONFIG if char_config is None else char_config).glob("wpcost.blkx"):
         try:
-            with open(unit_file, 'r', encoding='utf-8') as f:
+            count_read(cost_file)
+            with open(cost_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Could not read or parse {unit_file}: {e}")
+        except json.JSONDecodeError:
+            logger.warning(f"Error reading BR data in: {cost_file}")
             continue
+        if isinstance(data, dict):
+            for name, entry in data.items():
+                if isinstance(entry, dict):
+                    yield name, entry
+        elif isinstance(data, list):
+            for entry in data:
+                if isinstance(entry, dict) and entry.get('name'):
+                    yield entry['name'], entry
+
+# Key of an object in wpcost.blkx, e.g. "us_battleship_iowa": {
+WPCOST_KEY_PATTERN = re.compile(rb'"([^"\\\s:,{}\[\]]+)"\s*:\s*\{')
+
+def decode_object_at(data, start, window=WPCOST_ENTRY_WINDOW):
+    """Decodes the JSON object starting at the byte offset start of data. Returns it with the byte offset of its end."""
+    decoder = json.JSONDecoder()
+    while True:
+        chunk = data[start:start + window].decode('utf-8', errors='replace')
+        try:
+            obj, end = decoder.raw_decode(chunk)
+            return obj, start + len(chunk[:end].encode('utf-8'))
+        except json.JSONDecodeError:
+            if start + window >= len(data):
+                raise
+            window *= 4
 
-        unit_name = unit_file.stem
-        
-        unit_data = {}
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict):
-                    unit_data.update(item)
-        elif isinstance(data, dict):
-            unit_data = data
-
-        # Map weapons from commonWeapons using only the filename as the key
-        if 'commonWeapons' in unit_data and isinstance(unit_data['commonWeapons'], list):
-            for weapon_entry in unit_data['commonWeapons']:
-                if isinstance(weapon_entry, dict) and 'Weapon' in weapon_entry:
-                    weapon_details = weapon_entry['Weapon']
-                    if 'blk' in weapon_details:
-                        weapon_filename = Path(weapon_details['blk']).name
-                        ship_weapon_map[weapon_filename].append(unit_name)
-        
-        # Map modifications
-        if 'modifications' in unit_data and isinstance(unit_data['modifications'], dict):
-            for mod_name in unit_data['modifications'].keys():
-                ship_mod_map[mod_name].append(unit_name)
-
-    return ship_weapon_map, ship_mod_map
-
-def load_br_values():
-    br_map = {}
-    for cost_file in Path(CHAR_CONFIG).glob("wpcost.blkx"):
+def scan_wpcost_entries(cost_file, names):
+    """
+    Yields (unit name, economy entry) of the given units from a dict-shaped wpcost.blkx without decoding the rest of it.
+    The file is memory-mapped and searched for the keys of the units, then only their entries are decoded. Stops once all units are found,
+    so only the part of the file up to the last of them is read (and counted by --timings).
+    """
+    names = set(names)
+    with open(cost_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            try:
+                while names:
+                    match = WPCOST_KEY_PATTERN.search(data, position)
+                    if not match:
+                        position = len(data)
+                        break
+                    position = match.end()
+                    name = match.group(1).decode('utf-8', errors='replace')
+                    if name not in names:
+                        continue
+                    entry, end = decode_object_at(data, match.end() - 1)
+                    # A nested key with the same name isn't an economy entry
+                    if any(key.startswith("economicRank") for key in entry):
+                        names.discard(name)
+                        position = end
+                        yield name, entry
+            finally:
+                count_read(cost_file, position)
+
+def wpcost_is_dict(cost_file):
+    with open(cost_file, 'rb') as f:
+        return f.read(4096).lstrip()[:1] == b'{'
+
+def load_wpcost_fields(names=None, fields=None, char_config=None):
+    """
+    Returns {unit name: {field: value}} with the given fields (all of them if None) of the given units (all if None) from wpcost.blkx.
+    Selected units are extracted from a dict-shaped file by scan_wpcost_entries, otherwise the whole file is decoded.
+    """
+    cost_file = Path(CHAR_CONFIG if char_config is None else char_config) / "wpcost.blkx"
+    if not cost_file.exists():
+        return {}
+    if names is not None and wpcost_is_dict(cost_file):
         try:
-            with open(cost_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            if isinstance(data, dict):
-                for name, entry in data.items():
-                    econ = entry.get('economicRankHistorical') if isinstance(entry, dict) else None
-                    if econ is not None:
-                        br_map[name] = econ
-            elif isinstance(data, list):
-                for entry in data:
-                    name = entry.get('name')
-                    econ = entry.get('economicRankHistorical')
-                    if name and econ is not None:
-                        br_map[name] = econ
+            entries = list(scan_wpcost_entries(cost_file, names))
         except json.JSONDecodeError:
-            print(f"Error reading BR data in: {cost_file}")
-    return br_map
+            logger.warning(f"Error reading BR data in: {cost_file}")
+            return {}
+    else:
+        names = None if names is None else set(names)
+        entries = [(name, entry) for name, entry in load_wpcost_entries(char_config) if names is None or name in names]
+    return {name: entry if fields is None else {field: entry.get(field) for field in fields} for name, entry in entries}
+
+def economic_rank_field(game_mode=None):
+    """Name of the wpcost.blkx field with the economic rank of the game mode (GAME_MODE by default)."""
+    return "economicRank" + GAME_MODES[GAME_MODE if game_mode is None else game_mode]
+
+def load_br_values(names=None, game_mode=None, char_config=None):
+    """Economic ranks (BR = rank / 3 + 1) of the given units (all units if None) in the game mode, from wpcost.blkx."""
+    field = economic_rank_field(game_mode)
+    return {name: values[field] for name, values in load_wpcost_fields(names, [field], char_config).items() if values[field] is not None}
 
 def jacob_de_marre_ap(caliber: float, mass: float, speed: float, explosive_mass: float, apcbc: bool) -> float:
     """
@@ -323,240 +751,1170 @@ def jacob_de_marre_ap(caliber: float, mass: float, speed: float, explosive_mass:
 
     return round(pen, 2)
 
-def parse_blkx_files(weapons_folder, units_folder, output_format, output_file=None, caliber_from_mm=280.0, caliber_to_mm=500.0):
+def load_weapon_data(blkx_file):
+    """Reads a weapon .blkx file and flattens it into a single dict. Returns None if the file has unexpected shape."""
+    count_read(blkx_file)
+    with open(blkx_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = data[0] if len(data) == 1 and isinstance(data[0], dict) else {k:v for d in data if isinstance(d, dict) for k,v in d.items()}
+    if not isinstance(data, dict):
+        return None
+    return data
+
+def get_default_bullet(data):
+    default_bullet_stats = data.get("bullet", {})
+    if isinstance(default_bullet_stats, list) and default_bullet_stats:
+        default_bullet_stats = default_bullet_stats[0]
+    return default_bullet_stats if isinstance(default_bullet_stats, dict) else {}
+
+def index_weapon_file(blkx_file):
+    """
+    Builds the sidecar index entry of a single weapon file: the calibre used for the --from/--to filter,
+    the calibres of all bullets, the weapon type and the keys and bulletNames of the bullet blocks.
+    """
+    entry = {"caliber": None, "calibers": [], "weapon_type": None, "bullets": [], "bullet_names": []}
+    try:
+        data = load_weapon_data(blkx_file)
+    except json.JSONDecodeError:
+        logger.warning(f"Error decoding JSON in file: {blkx_file}")
+        return entry
+    if data is None:
+        return entry
+
+    entry["caliber"] = get_default_bullet(data).get("caliber", 0)
+    entry["weapon_type"] = data.get("weaponType", 0)
+    calibers = set()
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(value.get('bullet'), dict):
+            entry["bullets"].append(key)
+            entry["bullet_names"].append(value['bullet'].get("bulletName", key))
+            if isinstance(value['bullet'].get("caliber"), (int, float)):
+                calibers.add(value['bullet']["caliber"])
+    entry["calibers"] = sorted(calibers)
+    return entry
+
+@timed_stage("load_weapon_index")
+def load_weapon_index(weapons_folder, reuse=None):
+    """
+    Loads the sidecar index of the weapons folder, re-indexing only the files that were added or changed since the last run.
+    reuse optionally holds the index entries of another weapons folder, taken over for identical files (see update_file_entries).
+    Returns the index entries by file name and the list of (caliber, file name) pairs of the guns, sorted by caliber.
+    """
+    index_path = Path(weapons_folder) / WEAPON_INDEX_FILE
+    saved = load_json_index(index_path, WEAPON_INDEX_VERSION)
+    files, changed = update_file_entries(Path(weapons_folder).glob("*.blkx"), saved.get("files", {}), index_weapon_file, reuse)
+    if changed:
+        save_json_index(index_path, {"version": WEAPON_INDEX_VERSION, "files": files})
+
+    guns_by_caliber = sorted(
+        (entry["caliber"], name) for name, entry in files.items()
+        if entry["weapon_type"] == 0 and isinstance(entry["caliber"], (int, float))
+    )
+    return files, guns_by_caliber
+
+def select_weapon_files(guns_by_caliber, caliber_from_mm, caliber_to_mm):
+    """Binary search of the sorted index for the weapon files within the calibre range (in millimeters, inclusive)."""
+    calibers = [caliber for caliber, _ in guns_by_caliber]
+    start = bisect_left(calibers, caliber_from_mm / 1000)
+    end = bisect_right(calibers, caliber_to_mm / 1000)
+    return [name for _, name in guns_by_caliber[start:end]]
+
+TABLE_COLUMNS = [
+    ("weapon", "Weapon"),
+    ("bullet_name", "Bullet Name"),
+    ("bullet_type", "Type"),
+    ("ships", "Ships"),
+    ("battle_ratings", "BR"),
+    ("ship_types", "Class"),
+    ("caliber_mm", "Caliber (mm)"),
+    ("speed", "Speed"),
+    ("rate_of_fire", "Rate of Fire"),
+    ("max_delta_angle", "Max Delta Angle"),
+    ("max_delta_angle_vertical", "Max Delta Angle Vertical"),
+    ("mass", "Mass"),
+    ("explosive_mass", "Explosive Mass"),
+    ("filler_percent", "Filler %"),
+    ("fuse_delay", "Fuse Delay (s)"),
+    ("fuse_delay_m", "Fuse Delay (m)"),
+    ("explode_threshold", "Explode Threshold"),
+    ("jacob_de_marre", "Jacob de Marre Pen 0° 0m"),
+    ("Cx", "Cx"),
+    ("demarrePenetrationK", "demarrePenetrationK"),
+]
+
+def parse_weapon_file(blkx_file, unit_index, caliber_from_mm=280.0, caliber_to_mm=500.0):
+    """
+    Parses all bullets of a single weapon file into shell records with raw (untranslated) names.
+    Returns an empty list for files outside of the calibre range or that aren't guns.
+    """
     default_demarrePenetrationK = 1
+    ship_weapon_map, ship_mod_map = unit_index["weapons"], unit_index["modifications"]
+    units = unit_index["units"]
+
+    data = load_weapon_data(blkx_file)
+    if data is None:
+        return []
+
+    # Double-check the filter, in case the file changed after the index was loaded
+    default_bullet_stats = get_default_bullet(data)
+    caliber = default_bullet_stats.get("caliber", 0)
+    weapon_type = data.get("weaponType", 0)
+    if weapon_type != 0 or not (caliber_from_mm / 1000 <= caliber <= caliber_to_mm / 1000):
+        return []
+
+    # Identify Default Bullet
+    default_bullet_name = default_bullet_stats.get("bulletName")
+    weapon_filename = blkx_file.name.replace('.blkx', '.blk')
+
+    shells = []
+    # Iterate through all bullet types defined in the file
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(value.get('bullet'), dict):
+            current = value.get("bullet", {})
+            bullet_name_from_data = current.get("bulletName", key)
+
+            ship_units = set()
+
+            # Case 1: The bullet is the weapon's default ammunition.
+            # Find all ships that have this weapon equipped by its filename.
+            if bullet_name_from_data == default_bullet_name:
+                ship_units.update(ship_weapon_map.get(weapon_filename, []))
+
+            # Case 2: The bullet is an unlockable modification.
+            # Find ships that have this bullet's block name or bulletName as a modification.
+            ship_units.update(ship_mod_map.get(key, []))
+            ship_units.update(ship_mod_map.get(bullet_name_from_data, []))
+
+            # Always output the bullet information, even if no ships are found.
+            filtered_ships = [u for u in sorted(list(ship_units)) if not u.endswith("_ec")]
+            unit_brs = [units[u]["br"]/3+1 if u in units and units[u]["br"] is not None else None for u in filtered_ships]
+            br_list = [br for br in unit_brs if br is not None]
+
+            raw_bullet_type = current.get("bulletType", 0)
+            demarrePenetrationK = current.get("damage", {}).get("kinetic", {}).get("demarrePenetrationK", default_demarrePenetrationK)
+
+            try:
+                shells.append({
+                    "weapon_file": weapon_filename,
+                    "bullet_key": key,
+                    "weapon": blkx_file.stem,
+                    "bullet_name": bullet_name_from_data,
+                    "bullet_type": bullet_type_translation.get(raw_bullet_type, value.get("bulletType", 0)),
+                    "raw_bullet_type": raw_bullet_type,
+                    "units": filtered_ships,
+                    "battle_ratings": [round(b,1) for b in br_list],
+                    "unit_battle_ratings": [None if br is None else round(br,1) for br in unit_brs],
+                    "caliber": caliber,
+                    "caliber_mm": round(caliber*1000),
+                    "speed": round(current.get("speed", 0)),
+                    "muzzle_speed": current.get("speed", 0),
+                    "rate_of_fire": round(data.get("shotFreq", 0)*60, 2),
+                    "max_delta_angle": data.get("maxDeltaAngle", 0),
+                    "max_delta_angle_vertical": data.get("maxDeltaAngleVertical", 0),
+                    "mass": current.get("mass", 0),
+                    "explosive_mass": current.get("explosiveMass", 0),
+                    "filler_percent": round((current.get("explosiveMass",0)/current.get("mass",1))*100,2),
+                    "fuse_delay": current.get("fuseDelay", 0),
+                    "fuse_delay_m": round(current.get("fuseDelay", 0) * current.get("speed", 0),1),
+                    "explode_threshold": current.get("explodeTreshold",0),
+                    "jacob_de_marre": round(demarrePenetrationK * jacob_de_marre_ap(caliber*1000, current.get("mass", 0), current.get("speed", 0), current.get("explosiveMass", 0), bullet_type_is_de_marre_apcbc.get(raw_bullet_type, False) ),2),
+                    "Cx": current.get("Cx", 0),
+                    "demarrePenetrationK": demarrePenetrationK
+                })
+            except TypeError as e:
+                logger.error(f"TypeError {e}\n{blkx_file.stem}\n{bullet_name_from_data}\n{raw_bullet_type}")
+                raise
+        # else:
+            # print(f"failed for key {key} - stem: {blkx_file.stem}")
+    return shells
+
+def iter_shell_records(weapons_folder, units_folder, caliber_from_mm=280.0, caliber_to_mm=500.0, bands=None):
+    """
+    Yields the shell records of all guns within the calibre range, one weapon file at a time.
+    bands is an optional list of (from, to) calibre ranges used instead of the single range: every file within any of them is parsed once, in calibre order.
+    """
+    unit_index = build_unit_index(units_folder)
+    _, guns_by_caliber = load_weapon_index(weapons_folder)
+    yield from iter_weapon_shells(weapons_folder, guns_by_caliber, unit_index, bands or [(caliber_from_mm, caliber_to_mm)])
+
+def iter_weapon_shells(weapons_folder, guns_by_caliber, unit_index, bands):
+    """Yields the shell records of the guns within any of the (from, to) calibre bands, using already loaded indexes."""
+    # Filter by Caliber and weapon type using the sidecar index, so only the matching files get decoded
+    selected = set()
+    for band_from_mm, band_to_mm in bands:
+        selected.update(select_weapon_files(guns_by_caliber, band_from_mm, band_to_mm))
+    lowest_mm, highest_mm = min(band[0] for band in bands), max(band[1] for band in bands)
+    for blkx_name in (name for _, name in guns_by_caliber if name in selected):
+        blkx_file = Path(weapons_folder) / blkx_name
+        try:
+            yield from parse_weapon_file(blkx_file, unit_index, lowest_mm, highest_mm)
+        except json.JSONDecodeError:
+            logger.warning(f"Error decoding JSON in file: {blkx_file}")
 
-    ship_weapon_map, ship_mod_map = build_ship_and_mod_maps(units_folder)
-    br_map = load_br_values()
-
-    json_output = [] if output_format == 'json' else None
-    csv_output = [] if output_format == 'csv' else None
-    output_lines = []
-
-    if output_format == 'html':
-        output_lines.append(' ')
-        output_lines.append('<table class="sortable">')
-        output_lines.append('  <thead>')
-        output_lines.append('    <tr><th>Weapon</th><th>Bullet Name</th><th>Type</th><th>Ships</th><th>BR</th><th>Class</th><th>Caliber (mm)</th><th>Speed</th><th>Rate of Fire</th><th>Max Delta Angle</th><th>Max Delta Angle Vertical</th><th>Mass</th><th>Explosive Mass</th><th>Filler %</th><th>Fuse Delay (s)</th><th>Fuse Delay (m)</th><th>Explode Threshold</th><th>Jacob de Marre Pen 0° 0m</th><th>Cx</th><th>demarrePenetrationK</th></tr>')
-        output_lines.append('  </thead>')
-        output_lines.append('  <tbody>')
-    elif output_format == 'csv':
-        csv_headers = ['Weapon', 'Bullet Name', 'Type', 'Ships', 'BR', 'Class', 'Caliber (mm)', 'Speed', 'Rate of Fire', 'Max Delta Angle', 'Max Delta Angle Vertical', 'Mass', 'Explosive Mass', 'Filler %', 'Fuse Delay (s)', 'Fuse Delay (m)', 'Explode Threshold', 'Jacob de Marre Pen 0° 0m', 'Cx', 'demarrePenetrationK']
-        csv_output.append(csv_headers)
-
-    for blkx_file in Path(weapons_folder).glob("*.blkx"):
+@dataclass
+class ShellRecord:
+    """
+    A shell record (see parse_weapon_file) with raw, untranslated names, as returned by NavalWeapons.shells().
+    ranges holds the pen_<distance>m and tof_<distance>m values when the ranges were requested.
+    """
+    weapon_file: str
+    bullet_key: str
+    weapon: str
+    bullet_name: str
+    bullet_type: str
+    raw_bullet_type: str
+    units: List[str]
+    battle_ratings: List[float]
+    unit_battle_ratings: List[Optional[float]]
+    caliber: float
+    caliber_mm: int
+    speed: int
+    muzzle_speed: float
+    rate_of_fire: float
+    max_delta_angle: float
+    max_delta_angle_vertical: float
+    mass: float
+    explosive_mass: float
+    filler_percent: float
+    fuse_delay: float
+    fuse_delay_m: float
+    explode_threshold: float
+    jacob_de_marre: float
+    Cx: float
+    demarrePenetrationK: float
+    ranges: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, shell):
+        names = {f.name for f in fields(cls)} - {"ranges"}
+        return cls(**{key: value for key, value in shell.items() if key in names}, ranges={key: value for key, value in shell.items() if key not in names})
+
+    def to_dict(self):
+        """The record as the dict used by the writers and format_record."""
+        shell = {f.name: getattr(self, f.name) for f in fields(self) if f.name != "ranges"}
+        shell.update(self.ranges)
+        return shell
+
+def range_columns(ranges):
+    """Extra table columns with the penetration and time of flight at each of the ranges (in meters)."""
+    columns = []
+    for distance in ranges:
+        columns.append((f"pen_{distance:g}m", f"Jacob de Marre Pen 0° {distance:g}m"))
+        columns.append((f"tof_{distance:g}m", f"Time of Flight {distance:g}m (s)"))
+    return columns
+
+def add_range_columns(records, ranges, batch_size=RANGE_BATCH_SIZE):
+    """
+    Adds the penetration and time of flight at the given ranges to the shell records.
+    The records are computed with naval_ballistics (requires numpy) in batches, so they keep streaming to the output.
+    Values that can't be computed (e.g. the time of flight of a shell without speed) are None, written as null/empty cells.
+    """
+    import naval_ballistics
+
+    def numeric(value):
+        return value if isinstance(value, (int, float)) else 0
+
+    def rounded(value):
+        value = float(value)
+        return round(value, 2) if math.isfinite(value) else None
+
+    def process(batch):
+        pen, tof = naval_ballistics.penetration_table(
+            [numeric(shell["caliber"]) * 1000 for shell in batch],
+            [numeric(shell["mass"]) for shell in batch],
+            [numeric(shell["muzzle_speed"]) for shell in batch],
+            [numeric(shell["explosive_mass"]) for shell in batch],
+            [bullet_type_is_de_marre_apcbc.get(shell["raw_bullet_type"], False) for shell in batch],
+            [numeric(shell["Cx"]) for shell in batch],
+            [numeric(shell["demarrePenetrationK"]) for shell in batch],
+            ranges
+        )
+        for i, shell in enumerate(batch):
+            for j, distance in enumerate(ranges):
+                shell[f"pen_{distance:g}m"] = rounded(pen[i, j])
+                shell[f"tof_{distance:g}m"] = rounded(tof[i, j])
+        return batch
+
+    batch = []
+    for shell in records:
+        batch.append(shell)
+        if len(batch) >= batch_size:
+            yield from process(batch)
+            batch = []
+    if batch:
+        yield from process(batch)
+
+def format_record(shell, output_format):
+    """Translates the names of a shell record for the given output format, with the module-level translations. Returns the table row as a dict."""
+    return module_translator().format_record(shell, output_format)
+
+
+class TableWriter(ABC):
+    """
+    Base class of the streaming writers. Each row is written to the stream as soon as it's passed to write_record,
+    so the memory use stays flat and the output shows up while the weapon files are still being parsed.
+    """
+    needs_path = False # writers of the binary formats get the output path instead of a text stream
+    typed_cells = False # writers that keep the values typed, so the diff mode can't write "old → new" into the cells
+
+    def __init__(self, stream, columns=TABLE_COLUMNS):
+        self.stream = stream
+        self.columns = columns
+
+    def write_header(self):
+        pass
+
+    @abstractmethod
+    def write_record(self, record):
+        """Writes one table row, as returned by format_record."""
+
+    def close(self):
+        pass
+
+    def cell(self, record, key):
+        value = record.get(key, '')
+        if isinstance(value, list):
+            return ', '.join(str(v) for v in value)
+        return value
+
+
+class WikitextWriter(TableWriter):
+    def write_record(self, record):
+        cells = '\n'.join(f"| {self.cell(record, key)}" for key, _ in self.columns)
+        self.stream.write(f"|-\n{cells}\n")
+
+
+class HtmlWriter(TableWriter):
+    def write_header(self):
+        headers = ''.join(f"<th>{header}</th>" for _, header in self.columns)
+        self.stream.write(f' \n<table class="sortable">\n  <thead>\n    <tr>{headers}</tr>\n  </thead>\n  <tbody>\n')
+
+    def write_record(self, record):
+        cells = ''.join(f"<td>{self.cell(record, key)}</td>" for key, _ in self.columns)
+        self.stream.write(f"    <tr>{cells}</tr>\n")
+
+    def close(self):
+        self.stream.write('  </tbody>\n</table>\n')
+
+
+class CsvWriter(TableWriter):
+    def __init__(self, stream, columns=TABLE_COLUMNS):
+        super().__init__(stream, columns)
+        self.writer = csv.writer(stream, delimiter=CSV_DELIMITER, lineterminator=CSV_LINETERMINATOR)
+
+    def write_header(self):
+        self.writer.writerow([header for _, header in self.columns])
+
+    def cell(self, record, key):
+        value = record.get(key, '')
+        if isinstance(value, list):
+            return CSV_LISTSEPARATOR.join(str(v) for v in value)
+        return value
+
+    def write_record(self, record):
+        self.writer.writerow([self.cell(record, key) for key, _ in self.columns])
+
+
+class JsonWriter(TableWriter):
+    """Writes a JSON array element by element, with the same layout as json.dump(records, indent=2)."""
+    def __init__(self, stream, columns=TABLE_COLUMNS):
+        super().__init__(stream, columns)
+        self.count = 0
+
+    def write_record(self, record):
+        record = {key: record[key] for key, _ in self.columns if key in record}
+        if all(isinstance(record.get(key), list) for key in ("ships", "battle_ratings", "ship_types")):
+            record["ships"] = [
+                {"name": ship, "battle_rating": br, "type": stype}
+                for ship, br, stype in zip(record["ships"], record.pop("battle_ratings", []), record.pop("ship_types", []))
+            ]
+        element = json.dumps(record, indent=2).replace('\n', '\n  ')
+        self.stream.write(f"{',' if self.count else '['}\n  {element}")
+        self.count += 1
+
+    def close(self):
+        self.stream.write("\n]\n" if self.count else "[]\n")
+
+
+class TableDataWriter(TableWriter):
+    """
+    Compact JSON data file for docs/naval_weapons_table_lazy.html. Weapons and ships are listed once and referenced
+    by their position, the rows hold only plain values, so the page can filter and sort on typed data instead of the DOM.
+    Every column lists the "index" of its value in the rows; the Ships, BR and Class columns all come from the ship ids.
+    The rows are streamed, the weapons and ships lists are written at the end.
+    """
+    text_columns = ("weapon", "bullet_name", "bullet_type", "ships", "battle_ratings", "ship_types")
+    extra_text_columns = ("change",) # extra columns with text values, e.g. of the diff mode
+    typed_cells = True
+
+    def __init__(self, stream, columns=TABLE_COLUMNS):
+        super().__init__(stream, columns)
+        self.number_columns = [(key, header) for key, header in columns if key not in self.text_columns]
+        self.weapon_ids = {}
+        self.ship_ids = {}
+        self.count = 0
+
+    def write_header(self):
+        columns = [
+            {"key": "weapon", "header": "Weapon", "type": "weapon", "index": 0},
+            {"key": "bullet_key", "header": "Bullet Key", "type": "text", "index": 1},
+            {"key": "bullet_name", "header": "Bullet Name", "type": "text", "index": 2},
+            {"key": "bullet_type", "header": "Type", "type": "text", "index": 3},
+            {"key": "ships", "header": "Ships", "type": "ships", "index": 4},
+            {"key": "battle_ratings", "header": "BR", "type": "ship_brs", "index": 4},
+            {"key": "ship_types", "header": "Class", "type": "ship_types", "index": 4},
+        ] + [{"key": key, "header": header, "type": "text" if key in self.extra_text_columns else "number", "index": 5 + i}
+             for i, (key, header) in enumerate(self.number_columns)]
+        self.stream.write('{"columns":' + json.dumps(columns, ensure_ascii=False, separators=(',', ':')) + ',\n"rows":[')
+
+    def write_record(self, record):
+        weapon_id = self.weapon_ids.setdefault(record["weapon_file"], (len(self.weapon_ids), record["weapon"]))[0]
+        ship_ids = []
+        for unit, name, stype, br in zip(record["units"], record["ships"], record["ship_types"], record["unit_battle_ratings"]):
+            ship_ids.append(self.ship_ids.setdefault(unit, (len(self.ship_ids), name, stype, br))[0])
+        row = [weapon_id, record["bullet_key"], record["bullet_name"], record["bullet_type"], ship_ids]
+        row += [record.get(key) for key, _ in self.number_columns]
+        self.stream.write(("," if self.count else "") + "\n" + json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+        self.count += 1
+
+    def close(self):
+        weapons = [[Path(weapon_file).stem, name] for weapon_file, (_, name) in self.weapon_ids.items()]
+        ships = [[unit, name, stype, br] for unit, (_, name, stype, br) in self.ship_ids.items()]
+        self.stream.write('],\n"weapons":' + json.dumps(weapons, ensure_ascii=False, separators=(',', ':')) +
+                          ',\n"ships":' + json.dumps(ships, ensure_ascii=False, separators=(',', ':')) + '}\n')
+
+
+class NormalizedWriter(TableWriter):
+    """
+    Base class of the columnar outputs. Splits the rows into separate weapons, ships and shells tables,
+    linked by integer keys, with the ships of each shell listed in the shell_ships table.
+    The range columns (pen_<distance>m, tof_<distance>m) and the change column of the diff mode are added to the shells table.
+    Column types are given as Python types and mapped to the types of the target format.
+    """
+    needs_path = True
+    typed_cells = True
+    tables = {
+        "weapons": [("weapon_id", int), ("file", str), ("name", str), ("caliber_mm", int), ("rate_of_fire", float),
+                    ("max_delta_angle", float), ("max_delta_angle_vertical", float)],
+        "ships": [("ship_id", int), ("unit", str), ("name", str), ("type", str), ("battle_rating", float)],
+        "shells": [("shell_id", int), ("weapon_id", int), ("bullet_key", str), ("bullet_name", str), ("bullet_type", str),
+                   ("speed", float), ("mass", float), ("explosive_mass", float), ("filler_percent", float), ("fuse_delay", float),
+                   ("fuse_delay_m", float), ("explode_threshold", float), ("jacob_de_marre", float), ("Cx", float), ("demarrePenetrationK", float)],
+        "shell_ships": [("shell_id", int), ("ship_id", int)],
+    }
+
+    def __init__(self, path, columns=TABLE_COLUMNS):
+        super().__init__(path, columns)
+        extra_fields = [(key, float) for key, _ in columns if key.startswith(("pen_", "tof_"))]
+        if any(key == "change" for key, _ in columns):
+            extra_fields.append(("change", str))
+        if extra_fields:
+            self.tables = dict(self.tables, shells=self.tables["shells"] + extra_fields)
+        self.weapon_ids = {}
+        self.ship_ids = {}
+        self.shell_count = 0
+
+    def write_record(self, record):
+        weapon_id = self.weapon_ids.get(record["weapon_file"])
+        if weapon_id is None:
+            weapon_id = self.weapon_ids[record["weapon_file"]] = len(self.weapon_ids) + 1
+            self.add_row("weapons", [weapon_id, record["weapon_file"], record["weapon"], record["caliber_mm"], record["rate_of_fire"],
+                                     record["max_delta_angle"], record["max_delta_angle_vertical"]])
+
+        self.shell_count += 1
+        shell_id = self.shell_count
+        self.add_row("shells", [shell_id, weapon_id, record["bullet_key"]] + [record[name] for name, _ in self.tables["shells"][3:]])
+
+        for unit, name, stype, br in zip(record["units"], record["ships"], record["ship_types"], record["unit_battle_ratings"]):
+            ship_id = self.ship_ids.get(unit)
+            if ship_id is None:
+                ship_id = self.ship_ids[unit] = len(self.ship_ids) + 1
+                self.add_row("ships", [ship_id, unit, name, stype, br])
+            self.add_row("shell_ships", [shell_id, ship_id])
+
+    @abstractmethod
+    def add_row(self, table, values):
+        """Adds a row (values in the order of the table's fields) to one of the tables."""
+
+    def typed_row(self, table, values):
+        return [None if value is None else value_type(value) for (_, value_type), value in zip(self.tables[table], values)]
+
+
+class SqliteWriter(NormalizedWriter):
+    sql_types = {int: "INTEGER", float: "REAL", str: "TEXT"}
+
+    def __init__(self, path, columns=TABLE_COLUMNS):
+        super().__init__(path, columns)
+        if os.path.exists(path):
+            os.remove(path)
+        self.connection = sqlite3.connect(path)
+
+    def write_header(self):
+        foreign_keys = {
+            "shells": ", FOREIGN KEY (weapon_id) REFERENCES weapons(weapon_id)",
+            "shell_ships": ", FOREIGN KEY (shell_id) REFERENCES shells(shell_id), FOREIGN KEY (ship_id) REFERENCES ships(ship_id)",
+        }
+        for table, fields in self.tables.items():
+            columns = ', '.join(f"\"{name}\" {self.sql_types[value_type]}{' PRIMARY KEY' if i == 0 and table != 'shell_ships' else ''}"
+                                for i, (name, value_type) in enumerate(fields))
+            self.connection.execute(f"CREATE TABLE {table} ({columns}{foreign_keys.get(table, '')})")
+
+    def add_row(self, table, values):
+        self.connection.execute(f"INSERT INTO {table} VALUES ({', '.join('?' * len(values))})", self.typed_row(table, values))
+
+    def close(self):
+        self.connection.execute("CREATE INDEX shells_weapon ON shells(weapon_id)")
+        self.connection.execute("CREATE INDEX shell_ships_shell ON shell_ships(shell_id)")
+        self.connection.execute("CREATE INDEX shell_ships_ship ON shell_ships(ship_id)")
+        self.connection.commit()
+        self.connection.close()
+
+
+class ParquetWriter(NormalizedWriter):
+    """
+    Writes the tables as <table>.parquet files inside the output folder. Needs the optional pyarrow package.
+    The rows are buffered per table and written as a row group every PARQUET_ROW_GROUP_SIZE rows.
+    """
+    def __init__(self, path, columns=TABLE_COLUMNS):
+        super().__init__(path, columns)
         try:
-            with open(blkx_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                data = data[0] if len(data) == 1 and isinstance(data[0], dict) else {k:v for d in data if isinstance(d, dict) for k,v in d.items()}
-            if not isinstance(data, dict):
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Error: The 'pyarrow' package is not installed.\nTo install it, run: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.columns_data = {table: {name: [] for name, _ in fields} for table, fields in self.tables.items()}
+        self.row_counts = dict.fromkeys(self.tables, 0)
+        self.schemas = {}
+        self.writers = {}
+
+    def write_header(self):
+        arrow_types = {int: self.pa.int64(), float: self.pa.float64(), str: self.pa.string()}
+        os.makedirs(self.stream, exist_ok=True)
+        for table, fields in self.tables.items():
+            self.schemas[table] = self.pa.schema([(name, arrow_types[value_type]) for name, value_type in fields])
+            self.writers[table] = self.pq.ParquetWriter(os.path.join(self.stream, f"{table}.parquet"), self.schemas[table])
+
+    def add_row(self, table, values):
+        for (name, _), value in zip(self.tables[table], self.typed_row(table, values)):
+            self.columns_data[table][name].append(value)
+        self.row_counts[table] += 1
+        if self.row_counts[table] >= PARQUET_ROW_GROUP_SIZE:
+            self.flush(table)
+
+    def flush(self, table):
+        if self.row_counts[table]:
+            self.writers[table].write_table(self.pa.Table.from_pydict(self.columns_data[table], schema=self.schemas[table]))
+            for values in self.columns_data[table].values():
+                values.clear()
+            self.row_counts[table] = 0
+
+    def close(self):
+        for table, writer in self.writers.items():
+            self.flush(table)
+            writer.close()
+
+
+WRITERS = {
+    'wikitext': WikitextWriter,
+    'html': HtmlWriter,
+    'json': JsonWriter,
+    'csv': CsvWriter,
+    'tabledata': TableDataWriter,
+    'sqlite': SqliteWriter,
+    'parquet': ParquetWriter,
+}
+
+class TableOutput:
+    """
+    An output file (or stdout) with the writer of its format, fed one record at a time.
+    The records are turned into table rows with formatter; count is the number of rows written so far.
+    """
+    def __init__(self, output_format, output_file=None, columns=TABLE_COLUMNS, formatter=format_record):
+        self.output_format = output_format
+        self.output_file = output_file
+        self.formatter = formatter
+        self.count = 0
+        writer_class = WRITERS[output_format]
+        self.owns_stream = bool(output_file) and not writer_class.needs_path
+        if writer_class.needs_path:
+            stream = output_file
+        else:
+            stream = open(output_file, 'w', encoding='utf-8', newline='') if output_file else sys.stdout
+        try:
+            self.writer = writer_class(stream, columns)
+            self.writer.write_header()
+        except BaseException:
+            self.stream = stream
+            self.abort()
+            raise
+        self.stream = stream
+
+    def write(self, record, row=None):
+        """Writes the record, or the row already formatted for this output format if given."""
+        self.writer.write_record(self.formatter(record, self.output_format) if row is None else row)
+        self.count += 1
+
+    def close(self):
+        try:
+            self.writer.close()
+        finally:
+            self.abort()
+        if self.output_file:
+            logger.info(f"Output saved to {self.output_file}")
+
+    def abort(self):
+        """Closes the stream without finishing the output, after an error."""
+        if self.owns_stream:
+            self.stream.close()
+
+@timed_stage("write output")
+def write_records(records, output_format, output_file=None, columns=TABLE_COLUMNS, formatter=format_record):
+    """
+    Streams the records to output_file (or stdout) in the given format, turning each of them into a table row with formatter.
+    Returns the number of rows written.
+    """
+    if WRITERS[output_format].needs_path and not output_file:
+        raise ValueError(f"The {output_format} output format requires --filename")
+    output = TableOutput(output_format, output_file, columns, formatter)
+    try:
+        for record in records:
+            output.write(record)
+    except BaseException:
+        output.abort()
+        raise
+    output.close()
+    return output.count
+
+def write_shell_records(records, output_format, output_file=None, ranges=None, formatter=format_record):
+    """Writes the shell records as the table, with the extra columns of the ranges if given."""
+    columns = TABLE_COLUMNS
+    if ranges:
+        records = timed_iter("ranges", add_range_columns(records, ranges))
+        columns = TABLE_COLUMNS + range_columns(ranges)
+    return write_records(records, output_format, output_file, columns, formatter)
+
+def parse_blkx_files(weapons_folder, units_folder, output_format, output_file=None, caliber_from_mm=280.0, caliber_to_mm=500.0, ranges=None):
+    records = timed_iter("parse_blkx_files", iter_shell_records(weapons_folder, units_folder, caliber_from_mm, caliber_to_mm))
+    write_shell_records(records, output_format, output_file, ranges)
+
+def parse_target(value):
+    """Parses a --target value: FROM:TO:FORMAT:FILENAME (the filename may contain colons, e.g. C:\\tables\\big.html)."""
+    parts = value.split(':', 3)
+    if len(parts) != 4 or not parts[3]:
+        raise argparse.ArgumentTypeError(f"expected FROM:TO:FORMAT:FILENAME, got {value}")
+    try:
+        caliber_from_mm, caliber_to_mm = float(parts[0]), float(parts[1])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid calibre range in {value}")
+    if parts[2] not in WRITERS:
+        raise argparse.ArgumentTypeError(f"unknown output format {parts[2]} in {value}, choose from {', '.join(WRITERS)}")
+    return caliber_from_mm, caliber_to_mm, parts[2], parts[3]
+
+def parse_interval(value):
+    """Parses a --watch interval: a positive number of seconds."""
+    interval = float(value)
+    if not interval > 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number of seconds")
+    return interval
+
+def parse_blkx_files_to_targets(weapons_folder, units_folder, targets, ranges=None):
+    """
+    Writes several tables in one pass. targets is a list of (caliber_from_mm, caliber_to_mm, output_format, output_file):
+    the indexes are loaded once, every weapon file within any of the calibre ranges is parsed once and each shell record
+    is sent to all the targets whose range it's in.
+    """
+    bands = [(caliber_from_mm, caliber_to_mm) for caliber_from_mm, caliber_to_mm, _, _ in targets]
+    records = timed_iter("parse_blkx_files", iter_shell_records(weapons_folder, units_folder, bands=bands))
+    write_targets(records, targets, ranges)
+
+def write_targets(records, targets, ranges=None, formatter=format_record):
+    """Sends each shell record to all the targets (see parse_blkx_files_to_targets) whose range it's in. Rows are formatted once per output format."""
+    columns = TABLE_COLUMNS
+    if ranges:
+        records = timed_iter("ranges", add_range_columns(records, ranges))
+        columns = TABLE_COLUMNS + range_columns(ranges)
+
+    outputs = []
+    try:
+        with timed("write output"):
+            for caliber_from_mm, caliber_to_mm, output_format, output_file in targets:
+                outputs.append((caliber_from_mm / 1000, caliber_to_mm / 1000, TableOutput(output_format, output_file, columns, formatter)))
+        for record in records:
+            with timed("write output"):
+                rows = {}
+                for caliber_from, caliber_to, output in outputs:
+                    if caliber_from <= record["caliber"] <= caliber_to:
+                        if output.output_format not in rows:
+                            rows[output.output_format] = formatter(record, output.output_format)
+                        output.write(record, rows[output.output_format])
+    except BaseException:
+        for _, _, output in outputs:
+            output.abort()
+        raise
+    with timed("write output"):
+        for _, _, output in outputs:
+            output.close()
+
+
+DIFF_COLUMNS = [("change", "Change")] + TABLE_COLUMNS
+
+# Raw shell fields compared by the diff mode, with the table columns that show them
+DIFF_FIELDS = {key: [key] for key, _ in TABLE_COLUMNS if key not in ("ships", "ship_types", "battle_ratings")}
+DIFF_FIELDS["units"] = ["ships", "ship_types", "battle_ratings"]
+DIFF_FIELDS["unit_battle_ratings"] = ["battle_ratings"]
+
+def find_changed_weapon_files(old_weapons, new_weapons, old_units, new_units):
+    """
+    Compares the hashes kept in the indexes of the old and new data trees. Returns the names of the weapon files
+    that changed themselves, or that are used by a unit whose file, BR or mounted weapons (e.g. by a changed preset) changed
+    (directly or as a modification).
+    """
+    changed = {name for name in set(old_weapons) | set(new_weapons)
+               if old_weapons.get(name, {}).get("sha1") != new_weapons.get(name, {}).get("sha1")}
+
+    changed_units = [name for name in set(old_units) | set(new_units)
+                     if any(old_units.get(name, {}).get(field) != new_units.get(name, {}).get(field) for field in ("sha1", "br", "weapons"))]
+    if not changed_units:
+        return changed
+
+    files_by_bullet = defaultdict(set)
+    for weapons in (old_weapons, new_weapons):
+        for name, entry in weapons.items():
+            for bullet in entry["bullets"] + entry["bullet_names"]:
+                files_by_bullet[bullet].add(name)
+    for unit_name in changed_units:
+        for unit in (old_units.get(unit_name, {}), new_units.get(unit_name, {})):
+            changed.update(weapon_filename.replace('.blk', '.blkx') for weapon_filename in unit.get("weapons", []))
+            for mod_name in unit.get("modifications", []):
+                changed.update(files_by_bullet.get(mod_name, ()))
+    return changed
+
+def diff_shell_records(old, new, caliber_from_mm=280.0, caliber_to_mm=500.0):
+    """
+    Compares two unpacked data trees, each given as NavalWeapons. Only the weapon files affected by the changes get parsed.
+    Yields (status, old shell, new shell, changed fields) for every shell that was "added", "removed" or "changed";
+    the changed fields are the keys of DIFF_FIELDS.
+    """
+    old_weapons = old.weapon_index()[0]
+    old_units = old.unit_index()
+    # The files that didn't change in the update take over the index entries of the old tree, so they aren't decoded again
+    new_weapons = new.weapon_index(reuse=old_weapons)[0]
+    new_units = new.unit_index(reuse=old_units["files"])
+    trees = [(old.weapons_folder, old_weapons, old_units), (new.weapons_folder, new_weapons, new_units)]
+    (old_folder, old_weapons, old_index), (new_folder, new_weapons, new_index) = trees
+
+    for blkx_name in sorted(find_changed_weapon_files(old_weapons, new_weapons, old_index["units"], new_index["units"])):
+        shells = []
+        for folder, weapons, unit_index in trees:
+            blkx_file = Path(folder) / blkx_name
+            if blkx_name not in weapons:
+                shells.append({})
                 continue
+            try:
+                shells.append({shell["bullet_key"]: shell for shell in parse_weapon_file(blkx_file, unit_index, caliber_from_mm, caliber_to_mm)})
+            except json.JSONDecodeError:
+                logger.warning(f"Error decoding JSON in file: {blkx_file}")
+                shells.append({})
+        old_shells, new_shells = shells
+
+        for key in list(old_shells) + [key for key in new_shells if key not in old_shells]:
+            old, new = old_shells.get(key), new_shells.get(key)
+            if old is None:
+                yield "added", None, new, []
+            elif new is None:
+                yield "removed", old, None, []
+            else:
+                changed_fields = [field for field in DIFF_FIELDS if old.get(field) != new.get(field)]
+                if changed_fields:
+                    yield "changed", old, new, changed_fields
+
+def format_diff_record(change, output_format, mark_cells=True, formatter=format_record):
+    """
+    Formats a change from diff_shell_records as a table row with an extra "change" column.
+    With mark_cells, every changed cell shows "old → new"; otherwise the cells hold the new values.
+    """
+    status, old, new, changed_fields = change
+    record = formatter(new if new is not None else old, output_format)
+    if status != "changed":
+        record["change"] = status
+        return record
+
+    record["change"] = f"changed: {', '.join(changed_fields)}"
+    if mark_cells:
+        old_record = formatter(old, output_format)
+        for column in {column for field in changed_fields for column in DIFF_FIELDS[field]}:
+            old_value, new_value = old_record[column], record[column]
+            if old_value != new_value:
+                if isinstance(old_value, list):
+                    old_value, new_value = ', '.join(str(v) for v in old_value), ', '.join(str(v) for v in new_value)
+                record[column] = f"{old_value} → {new_value}"
+    return record
+
+def write_diff_records(changes, output_format, output_file=None, formatter=format_record):
+    """Writes the changes from diff_shell_records as a table, turning the shells into rows with formatter. Returns the number of rows written."""
+    mark_cells = not WRITERS[output_format].typed_cells
+    count = write_records(changes, output_format, output_file, DIFF_COLUMNS, lambda change, fmt: format_diff_record(change, fmt, mark_cells, formatter))
+    if output_file:
+        logger.info(f"{count} shells changed")
+    return count
 
-            # Filter by Caliber
-            default_bullet_stats = data.get("bullet", {})
-            if isinstance(default_bullet_stats, list) and default_bullet_stats:
-                default_bullet_stats = default_bullet_stats[0]
+def diff_blkx_files(old, new, output_format, output_file=None, caliber_from_mm=280.0, caliber_to_mm=500.0):
+    """Writes the changes between the old and new NavalWeapons as a table, with the names translated by the new one."""
+    return write_diff_records(diff_shell_records(old, new, caliber_from_mm, caliber_to_mm), output_format, output_file, new.format_record)
 
-            caliber = default_bullet_stats.get("caliber", 0)
-            weapon_type = data.get("weaponType", 0)
-            if weapon_type != 0 or not (caliber_from_mm / 1000 <= caliber <= caliber_to_mm / 1000):
-                continue
 
-            # Identify Default Bullet
-            default_bullet_name = default_bullet_stats.get("bulletName")
-            weapon_filename = blkx_file.name.replace('.blkx', '.blk')
-
-            # Iterate through all bullet types defined in the file
-            for key, value in data.items():
-                if isinstance(value, dict) and isinstance(value.get('bullet'), dict):
-                    
-                    current = value.get("bullet", {})
-                                        
-                    if isinstance(current, list):
-                        flat = {}
-                        for part in current:
-                            if isinstance(part, dict):
-                                flat.update(part)
-                        current = flat
-                    
-                    bullet_name_from_data = current.get("bulletName", key)
-
-                    ship_units = set()
-
-                    # Case 1: The bullet is the weapon's default ammunition.
-                    # Find all ships that have this weapon equipped by its filename.
-                    if bullet_name_from_data == default_bullet_name:
-                        ships_with_weapon = ship_weapon_map.get(weapon_filename, [])
-                        ship_units.update(ships_with_weapon)
-
-                    # Case 2: The bullet is an unlockable modification.
-                    # Find ships that have this bullet's block name or bulletName as a modification.
-                    ships_with_mod_by_key = ship_mod_map.get(key, [])
-                    ship_units.update(ships_with_mod_by_key)
-                    
-                    ships_with_mod_by_name = ship_mod_map.get(bullet_name_from_data, [])
-                    ship_units.update(ships_with_mod_by_name)
-
-                    # Always output the bullet information, even if no ships are found.
-                    weapon_name_str = translate_weapon_name(blkx_file.stem, round(caliber * 1000), output_format)
-                    bullet_name_str = translate_bullet_name(bullet_name_from_data, output_format)
-                    
-                    filtered_ships = [u for u in sorted(list(ship_units)) if not u.endswith("_ec")]
-                    ships_str_list = [translate_unit_name(u, output_format) for u in filtered_ships]
-
-
-
-                    bullet_type = bullet_type_translation.get(current.get("bulletType", 0), value.get("bulletType", 0))
-                    br_list = [br_map[u]/3+1 for u in filtered_ships if u in br_map]
-                    
-                    ship_types = [translate_unit_type(unit, output_format) for unit in filtered_ships]
-                    
-                    demarrePenetrationK = current.get("damage", {}).get("kinetic", {}).get("demarrePenetrationK", default_demarrePenetrationK)
-
-                    try:
-                        record = {
-                            "weapon": weapon_name_str,
-                            "bullet_name": bullet_name_str,
-                            "bullet_type": bullet_type,
-                            "ships": ships_str_list,
-                            "battle_ratings": [round(b,1) for b in br_list],
-                            "ship_types": ship_types,
-                            "caliber_mm": round(caliber*1000),
-                            "speed": round(current.get("speed", 0)),
-                            "rate_of_fire": round(data.get("shotFreq", 0)*60, 2),
-                            "max_delta_angle": data.get("maxDeltaAngle", 0),
-                            "max_delta_angle_vertical": data.get("maxDeltaAngleVertical", 0),
-                            "mass": current.get("mass", 0),
-                            "explosive_mass": current.get("explosiveMass", 0),
-                            "filler_percent": round((current.get("explosiveMass",0)/current.get("mass",1))*100,2),
-                            "fuse_delay": current.get("fuseDelay", 0),
-                            "fuse_delay_m": round(current.get("fuseDelay", 0) * current.get("speed", 0),1),
-                            "explode_threshold": current.get("explodeTreshold",0),
-                            "jacob_de_marre": round(demarrePenetrationK * jacob_de_marre_ap(caliber*1000, current.get("mass", 0), current.get("speed", 0), current.get("explosiveMass", 0), bullet_type_is_de_marre_apcbc.get(current.get("bulletType", 0), False) ),2),
-                            "Cx": current.get("Cx", 0),
-                            "demarrePenetrationK": demarrePenetrationK
-                        }
-                    except TypeError as e:
-                        print(f"TypeError {e}")
-                        print(weapon_name_str)
-                        print(bullet_name_str)
-                        print(current.get("bulletType", 0))
-                        raise
-
-                    if output_format == 'wikitext':
-                        output_lines.append(f"|-\n| {weapon_name_str}\n| {bullet_name_str}\n| {bullet_type}\n| {', '.join(ships_str_list)}\n| {', '.join(str(br) for br in record['battle_ratings'])}\n| {', '.join(ship_types)}\n| {record['caliber_mm']}\n| {record['speed']}\n| {record['rate_of_fire']}\n| {record['max_delta_angle']}\n| {record['max_delta_angle_vertical']}\n| {record['mass']}\n| {record['explosive_mass']}\n| {record['filler_percent']}\n| {record['fuse_delay']}\n| {record['fuse_delay_m']}\n| {record['explode_threshold']}\n| {record['jacob_de_marre']}\n| {record['Cx']}\n| {record['demarrePenetrationK']}")
-                    elif output_format == 'html':
-                        output_lines.append(f"    <tr><td>{weapon_name_str}</td><td>{bullet_name_str}</td><td>{bullet_type}</td><td>{', '.join(ships_str_list)}</td><td>{', '.join(str(b) for b in record['battle_ratings'])}</td><td>{', '.join(ship_types)}</td><td>{record['caliber_mm']}</td><td>{record['speed']}</td><td>{record['rate_of_fire']}</td><td>{record['max_delta_angle']}</td><td>{record['max_delta_angle_vertical']}</td><td>{record['mass']}</td><td>{record['explosive_mass']}</td><td>{record['filler_percent']}</td><td>{record['fuse_delay']}</td><td>{record['fuse_delay_m']}</td><td>{record['explode_threshold']}</td><td>{record['jacob_de_marre']}</td><td>{record['Cx']}</td><td>{record['demarrePenetrationK']}</td></tr>")
-                    elif output_format == 'json':
-                        new_ships_records = []
-                        for ship, br, stype in zip(record["ships"], record["battle_ratings"], record["ship_types"]):
-                            new_ships_records.append({
-                                "name": ship,
-                                "battle_rating": br,
-                                "type": stype
-                            })
-                        record['ships'] = new_ships_records
-                        del record["battle_ratings"]
-                        del record["ship_types"]
-                        json_output.append(record)
-                    elif output_format == 'csv':
-                        csv_row = [
-                            record['weapon'],
-                            record['bullet_name'],
-                            record['bullet_type'],
-                            CSV_LISTSEPARATOR.join(record['ships']),
-                            CSV_LISTSEPARATOR.join(str(b) for b in record['battle_ratings']),
-                            CSV_LISTSEPARATOR.join(record['ship_types']),
-                            record['caliber_mm'],
-                            record['speed'],
-                            record['rate_of_fire'],
-                            record['max_delta_angle'],
-                            record['max_delta_angle_vertical'],
-                            record['mass'],
-                            record['explosive_mass'],
-                            record['filler_percent'],
-                            record['fuse_delay'],
-                            record['fuse_delay_m'],
-                            record['explode_threshold'],
-                            record['jacob_de_marre'],
-                            record['Cx'],
-                            record['demarrePenetrationK']
-                        ]
-                        csv_output.append(csv_row)
-                # else:
-                    # print(f"failed for key {key} - stem: {blkx_file.stem}")
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON in file: {blkx_file}")
+def find_vromfs_archive(path):
+    """The .vromfs.bin archive that a path was unpacked from (e.g. aces.vromfs.bin for aces.vromfs.bin_u\\gamedata\\...), None if there isn't one."""
+    for folder in [Path(path)] + list(Path(path).parents):
+        if folder.name.endswith(".vromfs.bin_u"):
+            archive = folder.with_name(folder.name[:-2])
+            return archive if archive.exists() else None
+    return None
 
-    if output_format == 'html':
-        output_lines.append('  </tbody>')
-        output_lines.append('</table>')
+def file_sha1(path):
+    try:
+        return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+    except IOError:
+        return None
 
-    # Handle output to file or stdout
-    if output_file:
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            if output_format == 'json':
-                json.dump(json_output, f, indent=2)
-            elif output_format == 'csv':
-                writer = csv.writer(f, delimiter=CSV_DELIMITER, lineterminator=CSV_LINETERMINATOR)
-                writer.writerows(csv_output)
-            else:  # wikitext or html
-                f.write('\n'.join(output_lines))
-        print(f"Output saved to {output_file}")
-    else:
-        # Output to stdout
-        if output_format == 'json':
-            print(json.dumps(json_output, indent=2))
-        elif output_format == 'csv':
-            writer = csv.writer(subprocess.sys.stdout, delimiter=CSV_DELIMITER, lineterminator=CSV_LINETERMINATOR)
-            writer.writerows(csv_output)
-        else:  # wikitext or html
-            for line in output_lines:
-                print(line)
+class GameDataWatcher:
+    """
+    Polls the unpacked game folders (and the .vromfs.bin archives they come from) for changes.
+    Updated archives are unpacked again with VROMFS_UNPACK_SCRIPT, then only the .blk files whose content changed are decoded again.
+    """
+    def __init__(self, folders, files):
+        self.folders = [Path(folder) for folder in folders if folder]
+        self.files = [Path(path) for path in files if path]
+        self.archives = sorted({archive for archive in map(find_vromfs_archive, self.folders + self.files) if archive})
+        self.stats = self.snapshot()
+        self.blk_hashes = {path: file_sha1(path) for path in self.stats if path.endswith(".blk")}
+
+    def snapshot(self):
+        """(mtime, size) of the archives, the watched files and the .blk/.blkx files of the watched folders."""
+        paths = list(self.archives) + self.files
+        for folder in self.folders:
+            paths.extend(folder.glob("*.blk"))
+            paths.extend(folder.glob("*.blkx"))
+        stats = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            stats[str(path)] = (stat.st_mtime, stat.st_size)
+        return stats
+
+    def poll(self):
+        """Unpacks whatever was updated since the last call. Returns the paths that were added, changed or removed."""
+        stats = self.snapshot()
+        updated_archives = [archive for archive in self.archives if stats.get(str(archive)) != self.stats.get(str(archive))]
+        for archive in updated_archives:
+            logger.info(f"Unpacking the updated {archive}")
+            subprocess.run(["python", VROMFS_UNPACK_SCRIPT, str(archive)])
+        if updated_archives:
+            stats = self.snapshot()
+
+        # The unpacker rewrites every file of an archive, so compare the contents before decoding them again
+        to_decode = []
+        for path, stat in stats.items():
+            if path.endswith(".blk") and stat != self.stats.get(path):
+                sha1 = file_sha1(path)
+                if sha1 != self.blk_hashes.get(path) or not Path(path).with_suffix(".blkx").exists():
+                    self.blk_hashes[path] = sha1
+                    to_decode.append(Path(path))
+        if to_decode:
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                list(executor.map(lambda blk_file: unpack_blk_file(blk_file, force=True), to_decode))
+            stats = self.snapshot()
+
+        changed = {path for path in set(stats) | set(self.stats) if stats.get(path) != self.stats.get(path)}
+        self.stats = stats
+        return changed
+
+class IncrementalTable:
+    """
+    Shell records of the guns within the calibre range of a NavalWeapons, kept in memory by weapon file.
+    refresh() re-parses only the weapon files affected by the changes in the weapon and unit indexes since the previous call.
+    """
+    def __init__(self, data, caliber_from_mm=280.0, caliber_to_mm=500.0):
+        self.data = data
+        self.caliber_from_mm = caliber_from_mm
+        self.caliber_to_mm = caliber_to_mm
+        self.shells_by_file = {}
+        self.selected = []
+        self.weapons = None
+        self.units = None
+
+    def refresh(self):
+        """Updates the records. Returns the names of the weapon files that were parsed again or dropped."""
+        self.data.refresh()
+        weapons, guns_by_caliber = self.data.weapon_index()
+        unit_index = self.data.unit_index()
+        selected = select_weapon_files(guns_by_caliber, self.caliber_from_mm, self.caliber_to_mm)
+        if self.weapons is None:
+            affected = set(selected)
+        else:
+            affected = find_changed_weapon_files(self.weapons, weapons, self.units, unit_index["units"])
+            affected |= set(selected) ^ set(self.shells_by_file)
+
+        for blkx_name in affected:
+            self.shells_by_file.pop(blkx_name, None)
+        selected_names = set(selected)
+        for blkx_name in sorted(affected & selected_names):
+            blkx_file = Path(self.data.weapons_folder) / blkx_name
+            try:
+                self.shells_by_file[blkx_name] = parse_weapon_file(blkx_file, unit_index, self.caliber_from_mm, self.caliber_to_mm)
+            except json.JSONDecodeError:
+                logger.warning(f"Error decoding JSON in file: {blkx_file}")
+                self.shells_by_file[blkx_name] = []
+        self.selected, self.weapons, self.units = selected, weapons, unit_index["units"]
+        return affected
+
+    def records(self):
+        """The records in the same order as iter_shell_records."""
+        for blkx_name in self.selected:
+            yield from self.shells_by_file.get(blkx_name, [])
+
+
+class NavalWeapons:
+    """
+    The naval weapons of one unpacked game data tree, for use as a library:
+
+        data = NavalWeapons(weapons_folder, units_folder)
+        for shell in data.shells(280, 500):
+            ...
+
+    The weapon and unit indexes and the translations are loaded on first use and kept, so many queries can be answered
+    without reading the game files again; refresh() picks up the changed files. Nothing is printed (messages go to the
+    "naval_weapons_table" logger) and errors are raised. The paths, language and game mode default to the module constants.
+    """
+    def __init__(self, weapons_folder, units_folder=None, presets_folder=None, char_config=None, units_weaponry_csv=None, units_csv=None,
+                 language=None, game_mode=None, raw_names=False):
+        self.weapons_folder = weapons_folder
+        self.units_folder = units_folder
+        self.presets_folder = WEAPONSPRESETS if presets_folder is None else presets_folder
+        self.char_config = CHAR_CONFIG if char_config is None else char_config
+        self.units_weaponry_csv = UNITS_WEAPONRY_CSV if units_weaponry_csv is None else units_weaponry_csv
+        self.units_csv = UNITS_CSV if units_csv is None else units_csv
+        self.language = language
+        self.game_mode = GAME_MODE if game_mode is None else game_mode
+        self.raw_names = raw_names
+        self._translator = None
+        self._weapon_index = None
+        self._unit_index = None
+
+    def unpack(self):
+        """Unpacks the .blk files of the tree that don't have a .blkx yet."""
+        for folder in (self.weapons_folder, self.units_folder, self.char_config, self.presets_folder):
+            if folder:
+                unpack_blk_files(folder)
+
+    def translator(self):
+        """The Translator of the lang csv files. Raises FileNotFoundError if they are missing (unless raw_names is set)."""
+        if self._translator is None:
+            self._translator = Translator.load(self.units_weaponry_csv, self.units_csv, self.language, self.raw_names)
+        return self._translator
+
+    def weapon_index(self, reuse=None):
+        """(weapon files, guns by calibre), see load_weapon_index. reuse is used only if the index isn't loaded yet."""
+        if self._weapon_index is None:
+            self._weapon_index = load_weapon_index(self.weapons_folder, reuse)
+        return self._weapon_index
+
+    def unit_index(self, reuse=None):
+        """See build_unit_index. reuse is used only if the index isn't loaded yet."""
+        if self._unit_index is None:
+            self._unit_index = build_unit_index(self.units_folder, self.presets_folder, self.char_config, self.game_mode, reuse)
+        return self._unit_index
+
+    def refresh(self, translations=False):
+        """Drops the loaded indexes (and the translations if asked), so the next query sees the changed game files. Unchanged files aren't read again."""
+        self._weapon_index = None
+        self._unit_index = None
+        if translations:
+            self._translator = None
+
+    def shell_dicts(self, caliber_from_mm=280.0, caliber_to_mm=500.0, bands=None):
+        """Yields the shell records as dicts, like iter_shell_records, from the loaded indexes."""
+        _, guns_by_caliber = self.weapon_index()
+        return iter_weapon_shells(self.weapons_folder, guns_by_caliber, self.unit_index(), bands or [(caliber_from_mm, caliber_to_mm)])
+
+    def shells(self, caliber_from_mm=280.0, caliber_to_mm=500.0, ranges=None):
+        """Yields a ShellRecord for every shell of the guns within the calibre range, with the penetration and time of flight at the ranges if given."""
+        records = self.shell_dicts(caliber_from_mm, caliber_to_mm)
+        if ranges:
+            records = add_range_columns(records, ranges)
+        for shell in records:
+            yield ShellRecord.from_dict(shell)
+
+    def format_record(self, shell, output_format):
+        """The table row of a shell record (dict or ShellRecord) with the names translated for the output format."""
+        if isinstance(shell, ShellRecord):
+            shell = shell.to_dict()
+        return self.translator().format_record(shell, output_format)
+
+    def rows(self, caliber_from_mm=280.0, caliber_to_mm=500.0, output_format='json', ranges=None):
+        """Yields the table rows, as written by write()."""
+        for shell in self.shells(caliber_from_mm, caliber_to_mm, ranges):
+            yield self.format_record(shell, output_format)
+
+    def write(self, output_format, output_file=None, caliber_from_mm=280.0, caliber_to_mm=500.0, ranges=None):
+        """Writes the table to output_file (or stdout). Returns the number of rows written."""
+        records = timed_iter("parse_blkx_files", self.shell_dicts(caliber_from_mm, caliber_to_mm))
+        return write_shell_records(records, output_format, output_file, ranges, self.format_record)
+
+    def write_targets(self, targets, ranges=None):
+        """Writes several tables in one pass, see parse_blkx_files_to_targets."""
+        bands = [(caliber_from_mm, caliber_to_mm) for caliber_from_mm, caliber_to_mm, _, _ in targets]
+        records = timed_iter("parse_blkx_files", self.shell_dicts(bands=bands))
+        write_targets(records, targets, ranges, self.format_record)
+
+    def diff(self, old, caliber_from_mm=280.0, caliber_to_mm=500.0):
+        """Yields the changes since the old NavalWeapons, see diff_shell_records."""
+        return diff_shell_records(old, self, caliber_from_mm, caliber_to_mm)
+
+    def serve(self, port, caliber_from_mm=280.0, caliber_to_mm=500.0, host="127.0.0.1", ranges=None):
+        """
+        Answers the queries of naval_weapons_server over the shells of the calibre range until interrupted with Ctrl+C,
+        with the penetration and time of flight columns of the ranges if given.
+        """
+        import naval_weapons_server
+        records = self.shell_dicts(caliber_from_mm, caliber_to_mm)
+        columns = TABLE_COLUMNS
+        if ranges:
+            records = add_range_columns(records, ranges)
+            columns = TABLE_COLUMNS + range_columns(ranges)
+        naval_weapons_server.serve(records, port, self.format_record, columns, host)
+
+    def watch(self, output_format, output_file, caliber_from_mm=280.0, caliber_to_mm=500.0, ranges=None, interval=WATCH_INTERVAL):
+        """
+        Writes the table, then keeps checking the game files every interval seconds and rewrites it after every update,
+        re-parsing only the affected weapon files. Runs until interrupted with Ctrl+C.
+        """
+        table = IncrementalTable(self, caliber_from_mm, caliber_to_mm)
+        watcher = GameDataWatcher([self.weapons_folder, self.units_folder, self.presets_folder, self.char_config], [self.units_weaponry_csv, self.units_csv])
+        table.refresh()
+        write_shell_records(table.records(), output_format, output_file, ranges, self.format_record)
+        logger.info(f"Watching for game updates every {interval:g} s (press Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(interval)
+                changed = watcher.poll()
+                if not changed:
+                    continue
+                lang_changed = any(Path(path) in (Path(self.units_weaponry_csv), Path(self.units_csv)) for path in changed)
+                if lang_changed:
+                    self.refresh(translations=True)
+                affected = table.refresh()
+                if affected or lang_changed:
+                    logger.info(f"{time.strftime('%H:%M:%S')} game files changed, {len(affected)} weapon files updated")
+                    write_shell_records(table.records(), output_format, output_file, ranges, self.format_record)
+        except KeyboardInterrupt:
+            pass
+
+def watch_blkx_files(weapons_folder, units_folder, output_format, output_file, caliber_from_mm=280.0, caliber_to_mm=500.0, ranges=None, interval=WATCH_INTERVAL):
+    NavalWeapons(weapons_folder, units_folder, raw_names=RAW_NAMES).watch(output_format, output_file, caliber_from_mm, caliber_to_mm, ranges, interval)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Parse naval weapons data and output as table or JSON.")
     parser.add_argument('--weaponspath', required=True, help="Path to folder containing blk and blkx files of the weapons to parse, extracted from aces.vromfs.bin")
     parser.add_argument('--unitspath', required=False, help="Path to folder containing blk and blkx files of the units (e.g. ships), extracted from aces.vromfs.bin")
-    parser.add_argument('--outputformat', choices=['wikitext', 'html', 'json', 'csv'], default='wikitext', help="Output format: wikitext, html, json, or csv")
+    parser.add_argument('--outputformat', choices=list(WRITERS), help="Output format: (default) wikitext, html, json, csv, tabledata (compact json for docs/naval_weapons_table_lazy.html), sqlite (database file) or parquet (folder with one file per table, requires pyarrow). sqlite and parquet require --filename")
     parser.add_argument('--filename', help="Output filename. Please, include desired file extension. If not provided, output will be printed in the command line")
     parser.add_argument('--rawnames', action='store_true', help="If set, skip all translations and output raw file, bullet, and unit names")
     parser.add_argument('--from', dest='caliber_from_mm', type=float, default=280, help="Minimum calibre (in millimeters) of the guns to be displayed (accepts int or float, e.g. --from 76.2)")
     parser.add_argument('--to', dest='caliber_to_mm', type=float, default=500, help="Maximum calibre (in millimeters) of the guns to be displayed (accepts int or float)")
+    parser.add_argument('--target', dest='targets', action='append', type=parse_target, metavar='FROM:TO:FORMAT:FILENAME', help="Write a table of the guns from FROM to TO mm in FORMAT to FILENAME, e.g. --target 75:138.6:html:small.html. Repeat it to build several tables from a single pass over the game files; --from, --to, --outputformat and --filename are then ignored")
+    parser.add_argument('--gamemode', choices=list(GAME_MODES), default=GAME_MODE, help="Game mode of the battle ratings: arcade, realistic (default) or simulator")
+    parser.add_argument('--ranges', type=lambda value: [float(r) for r in value.split(',')], help="Comma-separated distances in meters (e.g. --ranges 0,5000,10000). Adds the Jacob de Marre penetration and the time of flight at each of them, accounting for the air drag (requires numpy)")
+    parser.add_argument('--oldweaponspath', help="Enables the diff mode: path to the weapons folder of the previous game version. Only the shells that changed since then will be listed")
+    parser.add_argument('--oldunitspath', help="Diff mode: path to the units folder of the previous game version (with its weaponpresets folder). Required with --unitspath")
+    parser.add_argument('--oldcharpath', help="Diff mode: path to the char.vromfs.bin_u\\config folder of the previous game version, for the BR changes. Required with --unitspath")
+    parser.add_argument('--serve', type=int, metavar='PORT', help="Instead of writing the table, keep the shells from the --from/--to range (with the --ranges columns) in memory and answer queries over a local HTTP JSON API on this port, 0 for any free port (see naval_weapons_server.py)")
+    parser.add_argument('--watch', type=parse_interval, nargs='?', const=WATCH_INTERVAL, metavar='SECONDS', help=f"Keep running and rewrite --filename whenever the game files (or the .vromfs.bin archives) change, checking every SECONDS (default {WATCH_INTERVAL}). Only the affected weapon files are parsed again")
+    parser.add_argument('--timings', action='store_true', help="At the end, print the wall time, files and bytes read and peak memory of every stage of the run. Tracing the memory slows the run down a bit")
+    parser.add_argument('--profile', metavar='FILE', help="Save a cProfile dump of the whole run to this file, to be opened with e.g. snakeviz or flameprof (flame graph)")
     args = parser.parse_args()
-
+    if args.oldweaponspath and args.unitspath and not (args.oldunitspath and args.oldcharpath):
+        parser.error("the diff mode with --unitspath also requires --oldunitspath and --oldcharpath of the previous game version, otherwise the ships and BRs of the two versions can't be compared")
+    if args.oldweaponspath and not args.unitspath and (args.oldunitspath or args.oldcharpath):
+        parser.error("--oldunitspath and --oldcharpath require --unitspath")
+    if args.serve is not None:
+        options = {"--outputformat": args.outputformat, "--filename": args.filename, "--target": args.targets, "--watch": args.watch, "--oldweaponspath": args.oldweaponspath}
+        ignored = [option for option, value in options.items() if value is not None]
+        if ignored:
+            parser.error(f"--serve answers queries instead of writing a table, it can't be combined with {', '.join(ignored)}")
+    args.outputformat = args.outputformat or 'wikitext'
+    if not os.path.isdir(args.weaponspath):
+        parser.error("Invalid weapons folder path.")
+    if args.unitspath and not os.path.isdir(args.unitspath):
+        parser.error("Invalid units folder path.")
+    if args.oldweaponspath and not os.path.isdir(args.oldweaponspath):
+        parser.error("Invalid old weapons folder path.")
+    if WRITERS[args.outputformat].needs_path and not args.filename and not args.targets:
+        parser.error(f"The {args.outputformat} output format requires --filename")
+    if args.watch is not None and args.targets:
+        parser.error("--watch supports a single table, use --filename instead of --target")
+    if args.watch is not None and not args.filename:
+        parser.error("--watch requires --filename")
+    # The messages go to stderr, so they don't mix with a table printed to stdout
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+
+    global TIMINGS
+    if args.timings:
+        TIMINGS = Timings()
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        run(args)
+    except (FileNotFoundError, ImportError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile saved to {args.profile}", file=sys.stderr)
+        if TIMINGS:
+            TIMINGS.report()
+            tracemalloc.stop()
+            TIMINGS = None
+
+def run(args):
+    """Runs the mode chosen on the command line. The arguments are checked by main(), errors are raised."""
     weapons_folder = args.weaponspath
     units_folder = args.unitspath
     output_format = args.outputformat
     output_file = args.filename
     caliber_from_mm = args.caliber_from_mm # 283 mm - Scharnhorst
     caliber_to_mm   = args.caliber_to_mm
-    global RAW_NAMES
-    RAW_NAMES = args.rawnames
 
-    if not os.path.isdir(weapons_folder):
-        print("Invalid weapons folder path.")
+    data = NavalWeapons(weapons_folder, units_folder, game_mode=args.gamemode, raw_names=args.rawnames)
+    data.unpack()
+    data.translator() # raises FileNotFoundError before anything is parsed if the lang files are missing
+
+    if args.oldweaponspath:
+        old_presets = Path(args.oldunitspath) / Path(WEAPONSPRESETS).name if args.oldunitspath else None
+        old = NavalWeapons(args.oldweaponspath, args.oldunitspath, old_presets, args.oldcharpath, game_mode=args.gamemode)
+        old.unpack()
+        changes = timed_iter("diff_shell_records", data.diff(old, caliber_from_mm, caliber_to_mm))
+        write_diff_records(changes, output_format, output_file, data.format_record)
         return
-    if units_folder and not os.path.isdir(units_folder):
-        print("Invalid units folder path.")
+    if args.serve is not None:
+        data.serve(args.serve, caliber_from_mm, caliber_to_mm, ranges=args.ranges)
         return
-
-    unpack_blk_files(weapons_folder)
-    if units_folder:
-        unpack_blk_files(units_folder)
-    unpack_blk_files(CHAR_CONFIG)
-    unpack_blk_files(WEAPONSPRESETS)
-    
-
-    if not RAW_NAMES:
-        global weapon_name_translation_dict
-        global bullet_name_translation_dict
-        global unit_name_translation_dict
-        global unit_type_translation_dict
-        weapon_name_translation_dict, bullet_name_translation_dict, unit_name_translation_dict, unit_type_translation_dict = load_translations()
-    parse_blkx_files(weapons_folder, units_folder, output_format, output_file, caliber_from_mm, caliber_to_mm)
+    if args.targets:
+        data.write_targets(args.targets, args.ranges)
+        return
+    if args.watch is not None:
+        data.watch(output_format, output_file, caliber_from_mm, caliber_to_mm, args.ranges, args.watch)
+        return
+    data.write(output_format, output_file, caliber_from_mm, caliber_to_mm, args.ranges)
 
 if __name__ == "__main__":
     main()
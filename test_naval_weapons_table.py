@@ -0,0 +1,505 @@
+import unittest
+from unittest.mock import patch
+import io
+import argparse
+import csv
+import json
+import shutil
+import sqlite3
+import tempfile
+import pstats
+import time
+import tracemalloc
+import importlib.util
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+import naval_weapons_table as nwt
+import naval_weapons_server
+from naval_synthetic_data import generate_game_data, use_game_data
+
+# run with: python -m unittest test_naval_weapons_table.py
+# Runs on a small synthetic game data tree (see naval_synthetic_data.py), no game install is needed
+class TestNavalWeaponsTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.saved_config = {name: getattr(nwt, name) for name in ("UNITS_WEAPONRY_CSV", "UNITS_CSV", "CHAR_CONFIG", "WEAPONSPRESETS")}
+        cls.root = tempfile.mkdtemp(prefix="naval_test_")
+        cls.paths = generate_game_data(cls.root, weapons=60, ships=40, seed=7)
+        use_game_data(nwt, cls.paths)
+        nwt.weapon_name_translation_dict, nwt.bullet_name_translation_dict, nwt.unit_name_translation_dict, nwt.unit_type_translation_dict = nwt.load_translations()
+
+    @classmethod
+    def tearDownClass(cls):
+        for name, value in cls.saved_config.items():
+            setattr(nwt, name, value)
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def fresh_tree(self, **options):
+        """Generates a game data tree of the test's own (deleted after it), for the tests that change the files. Returns its root and paths."""
+        root = Path(tempfile.mkdtemp(prefix="naval_test_"))
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        return root, generate_game_data(root, **{"weapons": 30, "ships": 20, "seed": 3, **options})
+
+    def guns(self):
+        """Generated gun files (weapons of type 0) with their data, read directly from the files."""
+        guns = {}
+        for path in Path(self.paths["weapons"]).glob("*.blkx"):
+            data = nwt.load_weapon_data(path)
+            if data.get("weaponType", 0) == 0:
+                guns[path.name] = data
+        return guns
+
+    def records(self, caliber_from_mm=0, caliber_to_mm=500):
+        with patch('sys.stdout', new_callable=io.StringIO):
+            return list(nwt.iter_shell_records(self.paths["weapons"], self.paths["units"], caliber_from_mm, caliber_to_mm))
+
+    def write(self, output_format, filename, caliber_from_mm=0, caliber_to_mm=500):
+        output_file = str(Path(self.root) / filename)
+        with patch('sys.stdout', new_callable=io.StringIO):
+            nwt.parse_blkx_files(self.paths["weapons"], self.paths["units"], output_format, output_file, caliber_from_mm, caliber_to_mm)
+        return output_file
+
+    def test_every_bullet_of_every_gun_is_listed(self):
+        expected = sorted(
+            (name.replace('.blkx', '.blk'), key) for name, data in self.guns().items()
+            for key, value in data.items() if isinstance(value, dict) and isinstance(value.get('bullet'), dict)
+        )
+        self.assertEqual(sorted((shell["weapon_file"], shell["bullet_key"]) for shell in self.records()), expected)
+
+    def test_calibre_range(self):
+        shells = self.records(150, 300)
+        self.assertGreater(len(shells), 0)
+        for shell in shells:
+            self.assertTrue(150 <= shell["caliber_mm"] <= 300)
+        in_range = [name for name, data in self.guns().items() if 0.15 <= nwt.get_default_bullet(data)["caliber"] <= 0.3]
+        self.assertEqual({shell["weapon_file"] for shell in shells}, {name.replace('.blkx', '.blk') for name in in_range})
+
+    def test_ships_of_the_default_bullet_and_modifications(self):
+        unit_index = nwt.build_unit_index(self.paths["units"])
+        for shell in self.records():
+            self.assertFalse(any(unit.endswith("_ec") for unit in shell["units"]))
+            for unit in shell["units"]:
+                entry = unit_index["units"][unit]
+                self.assertTrue(shell["weapon_file"] in entry["weapons"] or shell["bullet_key"] in entry["modifications"])
+            self.assertEqual(len(shell["unit_battle_ratings"]), len(shell["units"]))
+
+    def test_ships_of_the_weapon_presets(self):
+        _, paths = self.fresh_tree()
+        unit_index = nwt.build_unit_index(paths["units"], paths["presets"], paths["char"])
+        unit, entry = next((name, entry) for name, entry in unit_index["units"].items() if not name.endswith("_ec"))
+        weapon = next(path.name.replace('.blkx', '.blk') for path in sorted(Path(paths["weapons"]).glob("*.blkx"))
+                      if path.name.replace('.blkx', '.blk') not in entry["weapons"])
+        self.assertNotIn(unit, unit_index["weapons"].get(weapon, []))
+
+        (paths["presets"] / f"{entry['presets'][0]}.blkx").write_text(json.dumps({"Weapon": [{"blk": f"gameData/Weapons/navalModels_weapons/{weapon}"}]}), encoding='utf-8')
+        unit_index = nwt.build_unit_index(paths["units"], paths["presets"], paths["char"])
+        self.assertIn(unit, unit_index["weapons"][weapon])
+        self.assertIn(weapon, unit_index["units"][unit]["weapons"])
+
+    def test_weapon_index_is_reused(self):
+        nwt.load_weapon_index(self.paths["weapons"])
+        with patch('naval_weapons_table.index_weapon_file') as index_weapon_file:
+            files, guns_by_caliber = nwt.load_weapon_index(self.paths["weapons"])
+            index_weapon_file.assert_not_called()
+        self.assertEqual(len(guns_by_caliber), len(self.guns()))
+        self.assertEqual(guns_by_caliber, sorted(guns_by_caliber))
+
+    def test_unchanged_files_are_not_indexed_again(self):
+        root, paths = self.fresh_tree()
+        files, _ = nwt.load_weapon_index(paths["weapons"])
+        weapon_files = sorted(Path(paths["weapons"]).glob("*.blkx"))
+        for path in weapon_files: # a re-unpacked tree: new mtimes, same content
+            path.write_bytes(path.read_bytes())
+        weapon_files[0].write_text(weapon_files[0].read_text(encoding='utf-8').replace('"speed": ', '"speed": 1'), encoding='utf-8')
+        with patch('naval_weapons_table.index_weapon_file', wraps=nwt.index_weapon_file) as index_weapon_file:
+            nwt.load_weapon_index(paths["weapons"])
+        self.assertEqual([call.args[0] for call in index_weapon_file.call_args_list], [weapon_files[0]])
+
+        copy = root / "copy"
+        shutil.copytree(paths["weapons"], copy)
+        (copy / nwt.WEAPON_INDEX_FILE).unlink()
+        with patch('naval_weapons_table.index_weapon_file', wraps=nwt.index_weapon_file) as index_weapon_file:
+            copied, _ = nwt.load_weapon_index(copy, reuse=files)
+        self.assertEqual([call.args[0] for call in index_weapon_file.call_args_list], [copy / weapon_files[0].name])
+        self.assertEqual(copied[weapon_files[1].name]["bullets"], files[weapon_files[1].name]["bullets"])
+
+        unit_index = nwt.build_unit_index(paths["units"], paths["presets"], str(paths["char"]))
+        units_copy = root / "units_copy"
+        shutil.copytree(paths["units"], units_copy)
+        (units_copy / nwt.UNIT_INDEX_FILE).unlink()
+        unit_files = sorted(units_copy.glob("*.blkx"))
+        unit_files[0].write_bytes(unit_files[0].read_bytes() + b"\n")
+        with patch('naval_weapons_table.index_unit_file', wraps=nwt.index_unit_file) as index_unit_file, \
+                patch('naval_weapons_table.index_preset_file', wraps=nwt.index_preset_file) as index_preset_file:
+            copied_units = nwt.build_unit_index(units_copy, units_copy / paths["presets"].name, str(paths["char"]), reuse=unit_index["files"])
+        self.assertEqual([call.args[0] for call in index_unit_file.call_args_list], [unit_files[0]])
+        index_preset_file.assert_not_called()
+        self.assertEqual(copied_units["weapons"], unit_index["weapons"])
+
+    def test_br_values_from_dict_and_list_wpcost(self):
+        br_values = nwt.load_br_values()
+        self.assertEqual(len(br_values), 40)
+        _, paths = self.fresh_tree(weapons=60, ships=40, seed=7, wpcost_list=True)
+        with patch('naval_weapons_table.CHAR_CONFIG', str(paths["char"])):
+            self.assertEqual(nwt.load_br_values(), br_values)
+
+    def test_selected_units_from_wpcost(self):
+        ships = sorted(path.stem for path in Path(self.paths["units"]).glob("*.blkx"))[:10]
+        for game_mode in nwt.GAME_MODES:
+            all_units = nwt.load_br_values(game_mode=game_mode)
+            self.assertEqual(nwt.load_br_values(ships + ["missing_unit"], game_mode), {name: all_units[name] for name in ships})
+        fields = nwt.load_wpcost_fields(ships[:2], ["unitClass", "value"])
+        self.assertEqual(sorted(fields), ships[:2])
+        self.assertTrue(all(values["unitClass"].startswith("exp_") for values in fields.values()))
+
+    def test_incremental_table(self):
+        _, paths = self.fresh_tree()
+        with patch('naval_weapons_table.CHAR_CONFIG', str(paths["char"])), patch('naval_weapons_table.WEAPONSPRESETS', str(paths["presets"])), \
+                patch('sys.stdout', new_callable=io.StringIO):
+            table = nwt.IncrementalTable(nwt.NavalWeapons(paths["weapons"], paths["units"]), 0, 500)
+            self.assertGreater(len(table.refresh()), 0)
+            self.assertEqual(table.refresh(), set())
+
+            weapon_file = Path(table.selected[0])
+            data = json.loads((paths["weapons"] / weapon_file).read_text(encoding='utf-8'))
+            (paths["weapons"] / weapon_file).write_text(json.dumps(data).replace('"speed": ', '"speed": 1'), encoding='utf-8')
+            self.assertEqual(table.refresh(), {weapon_file.name})
+            self.assertEqual(list(table.records()), list(nwt.iter_shell_records(paths["weapons"], paths["units"], 0, 500)))
+
+    def test_watch_interval(self):
+        self.assertEqual(nwt.parse_interval("0.5"), 0.5)
+        for value in ("0", "-1", "nan"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                nwt.parse_interval(value)
+        with patch('sys.argv', ["naval_weapons_table.py", "--weaponspath", str(self.paths["weapons"]), "--filename", "table.txt", "--watch", "0"]), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr, self.assertRaises(SystemExit) as error:
+            nwt.main()
+        self.assertEqual(error.exception.code, 2)
+        self.assertIn("0 is not a positive number of seconds", stderr.getvalue())
+
+    def test_library_session(self):
+        data = nwt.NavalWeapons(self.paths["weapons"], self.paths["units"])
+        shells = list(data.shells(100, 400))
+        self.assertEqual([shell.to_dict() for shell in shells], self.records(100, 400))
+        with patch('naval_weapons_table.load_weapon_index') as load_weapon_index, patch('naval_weapons_table.build_unit_index') as build_unit_index:
+            rows = list(data.rows(100, 400, 'json'))
+            load_weapon_index.assert_not_called()
+            build_unit_index.assert_not_called()
+        self.assertEqual(rows, [nwt.format_record(shell.to_dict(), 'json') for shell in shells])
+        raw = nwt.NavalWeapons(self.paths["weapons"], self.paths["units"], units_csv="missing.csv", raw_names=True)
+        self.assertEqual(next(raw.rows(100, 400, 'json'))["ships"], shells[0].units)
+        with self.assertRaises(FileNotFoundError):
+            nwt.NavalWeapons(self.paths["weapons"], units_csv="missing.csv").translator()
+
+    def test_translation_index_language(self):
+        _, paths = self.fresh_tree()
+        csv_files = (str(paths["units_weaponry_csv"]), str(paths["units_csv"]))
+        unit = sorted(Path(paths["units"]).glob("*.blkx"))[0].stem
+        self.assertTrue(nwt.load_translations(*csv_files)[2].get(unit).endswith("(English)"))
+        self.assertTrue(paths["units_csv"].with_name(nwt.TRANSLATIONS_CACHE).exists())
+        with patch('naval_weapons_table.iter_translation_rows', wraps=nwt.iter_translation_rows) as iter_translation_rows:
+            self.assertTrue(nwt.load_translations(*csv_files)[2].get(unit).endswith("(English)"))
+            iter_translation_rows.assert_not_called()
+            self.assertTrue(nwt.load_translations(*csv_files, language="French")[2].get(unit).endswith("(French)"))
+            with patch('naval_weapons_table.TRANSLATIONS_LANGUAGE', "German"):
+                self.assertTrue(nwt.load_translations(*csv_files)[2].get(unit).endswith("(German)"))
+                paths["units_csv"].write_text(paths["units_csv"].read_text(encoding='utf-8').replace("(German)", "(Deutsch)"), encoding='utf-8')
+                self.assertTrue(nwt.load_translations(*csv_files)[2].get(unit).endswith("(Deutsch)"))
+            self.assertEqual(iter_translation_rows.call_count, 3)
+
+        # A cache that can't be opened is replaced by one in memory
+        paths["units_csv"].with_name(nwt.TRANSLATIONS_CACHE).unlink()
+        paths["units_csv"].with_name(nwt.TRANSLATIONS_CACHE).mkdir()
+        with self.assertLogs('naval_weapons_table', 'WARNING'):
+            self.assertTrue(nwt.load_translations(*csv_files, language="French")[2].get(unit).endswith("(French)"))
+
+    def test_timings_of_nested_stages(self):
+        weapon_files = sorted(Path(self.paths["weapons"]).glob("*.blkx"))[:2]
+        timings = nwt.Timings()
+        try:
+            with patch('naval_weapons_table.TIMINGS', timings):
+                with nwt.timed("outer"):
+                    nwt.count_read(weapon_files[0])
+                    with nwt.timed("inner"):
+                        nwt.count_read(weapon_files[1])
+                        buffer = bytearray(2**20)
+                        time.sleep(0.05)
+                    del buffer
+                self.assertEqual(list(nwt.timed_iter("items", range(5))), list(range(5)))
+                cost_file = Path(nwt.CHAR_CONFIG) / "wpcost.blkx"
+                with open(cost_file, 'r', encoding='utf-8') as f:
+                    first_unit = next(name for name, entry in json.load(f).items() if isinstance(entry, dict) and "economicRankHistorical" in entry)
+                with nwt.timed("wpcost"):
+                    self.assertEqual(list(nwt.load_wpcost_fields([first_unit], ["value"])), [first_unit])
+        finally:
+            tracemalloc.stop()
+        outer, inner, items, wpcost = (timings.stages[name] for name in ("outer", "inner", "items", "wpcost"))
+        self.assertEqual((outer["calls"], outer["files"], outer["bytes"]), (1, 1, weapon_files[0].stat().st_size))
+        self.assertEqual((inner["calls"], inner["files"], inner["bytes"]), (1, 1, weapon_files[1].stat().st_size))
+        self.assertGreaterEqual(inner["time"], 0.05)
+        self.assertLess(outer["time"], inner["time"]) # the nested stage isn't counted again
+        self.assertGreaterEqual(inner["peak"], 2**20)
+        self.assertGreaterEqual(outer["peak"], inner["peak"])
+        self.assertEqual(items["calls"], 1)
+        self.assertEqual(wpcost["files"], 1)
+        self.assertLess(wpcost["bytes"], cost_file.stat().st_size / 2)
+        report = io.StringIO()
+        timings.report(report)
+        self.assertEqual([line.split()[0] for line in report.getvalue().splitlines()], ["Stage", "outer", "inner", "items", "wpcost", "Total"])
+
+    def test_profile_dump(self):
+        root, _ = self.fresh_tree()
+        profile_file = str(root / "run.prof")
+        arguments = ["naval_weapons_table.py", "--weaponspath", str(self.paths["weapons"]), "--unitspath", str(self.paths["units"]),
+                     "--outputformat", "csv", "--filename", str(root / "table.csv"), "--profile", profile_file]
+        with patch('sys.argv', arguments), patch('logging.basicConfig'), patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            nwt.main()
+        self.assertIn(f"Profile saved to {profile_file}", stderr.getvalue())
+        functions = {function for _, _, function in pstats.Stats(profile_file).stats}
+        self.assertIn("run", functions)
+        self.assertIn("parse_weapon_file", functions)
+
+    def test_module_translator_is_reused(self):
+        translator = nwt.module_translator()
+        self.assertIs(nwt.module_translator(), translator)
+        with patch('naval_weapons_table.RAW_NAMES', True):
+            self.assertEqual(nwt.translate_unit_name("ship_1"), "ship_1")
+        with patch('naval_weapons_table.unit_name_translation_dict', {"ship_1": "Renamed ship"}):
+            self.assertEqual(nwt.translate_unit_name("ship_1", 'csv'), "Renamed ship")
+        self.assertIsNot(nwt.module_translator(), translator)
+        self.assertEqual(nwt.translate_unit_name("ship_1", 'csv'), nwt.unit_name_translation_dict.get("ship_1", "ship_1"))
+
+    def test_several_targets_in_one_pass(self):
+        targets = [(75, 150, 'json', str(Path(self.root) / "targets_small.json")), (75, 150, 'csv', str(Path(self.root) / "targets_small.csv")),
+                   (150, 500, 'csv', str(Path(self.root) / "targets_big.csv"))]
+        with patch('sys.stdout', new_callable=io.StringIO):
+            nwt.parse_blkx_files_to_targets(self.paths["weapons"], self.paths["units"], targets)
+        for caliber_from_mm, caliber_to_mm, output_format, output_file in targets:
+            expected = self.write(output_format, f"single.{output_format}", caliber_from_mm, caliber_to_mm)
+            with open(output_file, 'r', encoding='utf-8') as f, open(expected, 'r', encoding='utf-8') as g:
+                self.assertEqual(f.read(), g.read())
+
+    def test_output_formats(self):
+        shells = self.records(100, 400)
+        with open(self.write('json', 'table.json', 100, 400), 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+        self.assertEqual(len(rows), len(shells))
+        self.assertEqual([row["bullet_name"] for row in rows], [nwt.translate_bullet_name(shell["bullet_name"], 'json') for shell in shells])
+
+        with open(self.write('csv', 'table.csv', 100, 400), 'r', encoding='utf-8') as f:
+            reader = csv.reader(f, delimiter=nwt.CSV_DELIMITER)
+            self.assertEqual(next(reader), [header for _, header in nwt.TABLE_COLUMNS])
+            self.assertEqual(sum(1 for _ in reader), len(shells))
+
+        with open(self.write('wikitext', 'table.txt', 100, 400), 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines().count("|-"), len(shells))
+
+        connection = sqlite3.connect(self.write('sqlite', 'table.sqlite3', 100, 400))
+        try:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM shells").fetchone()[0], len(shells))
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM shell_ships").fetchone()[0], sum(len(shell["units"]) for shell in shells))
+        finally:
+            connection.close()
+
+    def test_diff_between_trees(self):
+        root, old_paths = self.fresh_tree()
+        _, new_paths = self.fresh_tree()
+
+        def session(paths):
+            return nwt.NavalWeapons(paths["weapons"], paths["units"], paths["presets"], str(paths["char"]),
+                                    str(paths["units_weaponry_csv"]), str(paths["units_csv"]))
+
+        def diff():
+            with patch('sys.stdout', new_callable=io.StringIO):
+                return list(nwt.diff_shell_records(session(old_paths), session(new_paths), 0, 500))
+
+        self.assertEqual(diff(), [])
+        with patch('sys.stdout', new_callable=io.StringIO):
+            shells = list(session(old_paths).shells(0, 500))
+        weapon_files = sorted({shell.weapon_file.replace('.blk', '.blkx') for shell in shells})
+        changed_file, removed_file = weapon_files[:2]
+        data = json.loads((new_paths["weapons"] / changed_file).read_text(encoding='utf-8'))
+        (new_paths["weapons"] / changed_file).write_text(json.dumps(data).replace('"speed": ', '"speed": 1'), encoding='utf-8')
+        (new_paths["weapons"] / removed_file).unlink()
+
+        changes = diff()
+        expected = [("changed", shell.bullet_key) for shell in shells if shell.weapon_file + 'x' == changed_file] + \
+                   [("removed", shell.bullet_key) for shell in shells if shell.weapon_file + 'x' == removed_file]
+        self.assertEqual(sorted((status, (new or old)["bullet_key"]) for status, old, new, _ in changes), sorted(expected))
+        for status, old, new, fields in changes:
+            if status == "changed":
+                self.assertIn("speed", fields)
+                self.assertGreater(new["speed"], old["speed"])
+            else:
+                self.assertEqual((new, fields), (None, []))
+
+        output_file = str(root / "diff.json")
+        with patch('sys.stdout', new_callable=io.StringIO):
+            nwt.diff_blkx_files(session(old_paths), session(new_paths), 'json', output_file, 0, 500)
+        with open(output_file, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+        self.assertEqual(len(rows), len(changes))
+        self.assertTrue(all(row["change"] == "removed" or "→" in str(row["speed"]) for row in rows))
+
+        # The typed tabledata cells keep the new values, also when the ships of a shell change
+        removed_unit = next(unit for shell in shells if shell.weapon_file + 'x' not in weapon_files[:2] for unit in shell.units)
+        (new_paths["units"] / f"{removed_unit}.blkx").unlink()
+        output_file = str(root / "diff_table_data.json")
+        with patch('sys.stdout', new_callable=io.StringIO):
+            nwt.diff_blkx_files(session(old_paths), session(new_paths), 'tabledata', output_file, 0, 500)
+        with open(output_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        change = next(column["index"] for column in data["columns"] if column["key"] == "change")
+        self.assertTrue(any(row[change].startswith("changed: units") for row in data["rows"]))
+        self.assertNotIn(removed_unit, [ship[0] for ship in data["ships"]])
+        self.assertTrue(all(ship[1] == session(new_paths).translator().unit_name(ship[0], 'tabledata') for ship in data["ships"]))
+        for column in data["columns"]:
+            if column["type"] == "number":
+                self.assertTrue(all(row[column["index"]] is None or isinstance(row[column["index"]], (int, float)) for row in data["rows"]), column["key"])
+
+    @unittest.skipUnless(importlib.util.find_spec('numpy'), "numpy is not installed")
+    def test_ballistics(self):
+        import naval_ballistics
+        shells = self.records()
+        caliber = [shell["caliber"] * 1000 for shell in shells]
+        mass = [shell["mass"] for shell in shells]
+        speed = [shell["muzzle_speed"] for shell in shells]
+        explosive_mass = [shell["explosive_mass"] for shell in shells]
+        apcbc = [nwt.bullet_type_is_de_marre_apcbc.get(shell["raw_bullet_type"], False) for shell in shells]
+        penetration = naval_ballistics.jacob_de_marre_ap(caliber, mass, speed, explosive_mass, apcbc)
+        for i, shell in enumerate(shells):
+            self.assertAlmostEqual(penetration[i], nwt.jacob_de_marre_ap(caliber[i], mass[i], speed[i], explosive_mass[i], apcbc[i]), places=2)
+
+        ranges = [0, 1000, 5000, 10000]
+        pen, tof = naval_ballistics.penetration_table(caliber, mass, speed, explosive_mass, apcbc,
+                                                      [shell["Cx"] for shell in shells], [1.0] * len(shells), ranges)
+        self.assertEqual(pen.shape, (len(shells), len(ranges)))
+        self.assertTrue((abs(pen[:, 0] - penetration) < 1e-9).all())
+        self.assertTrue((tof[:, 0] == 0).all())
+        self.assertTrue(((pen[:, 1:] < pen[:, :-1]) & (tof[:, 1:] > tof[:, :-1])).all())
+        # Without drag the shells keep their muzzle speed
+        pen, tof = naval_ballistics.penetration_table(caliber, mass, speed, explosive_mass, apcbc, [0.0] * len(shells), [1.0] * len(shells), ranges)
+        self.assertTrue((abs(pen[:, -1] - penetration) < 1e-9).all())
+        self.assertTrue((abs(tof[:, -1] - 10000 / naval_ballistics.np.asarray(speed)) < 1e-9).all())
+
+    def test_tabledata_columns_line_up(self):
+        shells = self.records(100, 400)
+        with open(self.write('tabledata', 'table_data.json', 100, 400), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(len(data["rows"]), len(shells))
+        for row, shell in zip(data["rows"], shells):
+            record = nwt.format_record(shell, 'tabledata')
+            self.assertEqual(len(row), max(column["index"] for column in data["columns"]) + 1)
+            for column in data["columns"]:
+                value = row[column["index"]]
+                if column["type"] == "weapon":
+                    self.assertEqual(data["weapons"][value], [Path(shell["weapon_file"]).stem, record["weapon"]])
+                elif column["type"] in ("ships", "ship_brs", "ship_types"):
+                    ships = [data["ships"][ship_id] for ship_id in value]
+                    self.assertEqual([ship[0] for ship in ships], shell["units"])
+                    self.assertEqual([ship[2] for ship in ships], record["ship_types"])
+                    self.assertEqual([ship[3] for ship in ships], shell["unit_battle_ratings"])
+                else:
+                    self.assertEqual(value, shell[column["key"]] if column["key"] == "bullet_key" else record[column["key"]], column["key"])
+
+    def test_server_queries(self):
+        shells = self.records()
+        naval_weapons_server.QueryHandler.dataset = naval_weapons_server.ShellDataset(shells, nwt.format_record, nwt.TABLE_COLUMNS)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), naval_weapons_server.QueryHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        def get(query):
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}{query}") as response:
+                return json.load(response)
+        try:
+            result = get("/shells?from=100&to=300&sort=jacob_de_marre&order=desc&limit=5")
+            expected = sorted((shell for shell in shells if 100 <= shell["caliber_mm"] <= 300), key=lambda shell: -shell["jacob_de_marre"])
+            self.assertEqual(result["total"], len(expected))
+            self.assertEqual([row["jacob_de_marre"] for row in result["rows"]], [shell["jacob_de_marre"] for shell in expected[:5]])
+            self.assertEqual(get("/shells?offset=3&limit=2")["rows"], get("/shells?limit=5")["rows"][3:5])
+            self.assertEqual(get("/meta")["count"], len(shells))
+            for query in ("/shells?offset=-1", "/shells?limit=-5", "/shells?sort=unknown"):
+                with self.assertRaises(urllib.error.HTTPError) as error:
+                    get(query)
+                self.assertEqual(error.exception.code, 400)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @unittest.skipUnless(importlib.util.find_spec('numpy'), "numpy is not installed")
+    def test_serve_with_ranges(self):
+        data = nwt.NavalWeapons(self.paths["weapons"], self.paths["units"])
+        with patch('naval_weapons_server.ThreadingHTTPServer.serve_forever', side_effect=KeyboardInterrupt), \
+                self.assertLogs('naval_weapons_table', 'INFO') as logs:
+            data.serve(0, 100, 400, ranges=[0, 5000])
+        self.assertIn("Serving", logs.output[-1])
+        dataset = naval_weapons_server.QueryHandler.dataset
+        self.assertEqual(dataset.columns[-2:], nwt.range_columns([5000]))
+        self.assertEqual(len(dataset.rows), len(self.records(100, 400)))
+        self.assertTrue(all(row["pen_5000m"] < row["pen_0m"] for row in dataset.rows if row["pen_0m"]))
+
+        for options in (["--outputformat", "json"], ["--filename", "table.txt"], ["--target", "100:200:csv:table.csv"], ["--watch"]):
+            with patch('sys.argv', ["naval_weapons_table.py", "--weaponspath", str(self.paths["weapons"]), "--serve", "0"] + options), \
+                    patch('sys.stderr', new_callable=io.StringIO) as stderr, self.assertRaises(SystemExit) as error:
+                nwt.main()
+            self.assertEqual(error.exception.code, 2)
+            self.assertIn(f"can't be combined with {options[0]}", stderr.getvalue())
+
+    @unittest.skipUnless(importlib.util.find_spec('numpy'), "numpy is not installed")
+    def test_range_columns_without_speed(self):
+        shells = [dict(shell) for shell in self.records(100, 400)[:3]]
+        shells[0]["muzzle_speed"] = 0
+        shells = list(nwt.add_range_columns(shells, [0, 5000]))
+        self.assertIsNone(shells[0]["tof_5000m"])
+        self.assertGreater(shells[1]["tof_5000m"], 0)
+        output = io.StringIO()
+        writer = nwt.JsonWriter(output, nwt.TABLE_COLUMNS + nwt.range_columns([0, 5000]))
+        for shell in shells:
+            writer.write_record(nwt.format_record(shell, 'json'))
+        writer.close()
+        rows = json.loads(output.getvalue(), parse_constant=lambda name: self.fail(f"{name} is not valid JSON"))
+        self.assertIsNone(rows[0]["tof_5000m"])
+
+    @unittest.skipUnless(importlib.util.find_spec('numpy'), "numpy is not installed")
+    def test_normalized_range_columns(self):
+        ranges = [0, 2.5, 5000]
+        outputs = {}
+        for output_format, filename in (('json', 'ranges.json'), ('sqlite', 'ranges.sqlite'), ('parquet', 'ranges_parquet')):
+            if output_format == 'parquet' and not importlib.util.find_spec('pyarrow'):
+                continue
+            outputs[output_format] = str(Path(self.root) / filename)
+            with patch('sys.stdout', new_callable=io.StringIO):
+                nwt.parse_blkx_files(self.paths["weapons"], self.paths["units"], output_format, outputs[output_format], 100, 400, ranges)
+        with open(outputs['json'], 'r', encoding='utf-8') as f:
+            expected = [[row[key] for key, _ in nwt.range_columns(ranges)] for row in json.load(f)]
+        keys = [key for key, _ in nwt.range_columns(ranges)]
+        self.assertEqual(keys, ["pen_0m", "tof_0m", "pen_2.5m", "tof_2.5m", "pen_5000m", "tof_5000m"])
+        connection = sqlite3.connect(outputs['sqlite'])
+        try:
+            self.assertEqual([row[1] for row in connection.execute("PRAGMA table_info(shells)")][-len(keys):], keys)
+            columns = ', '.join(f'"{key}"' for key in keys)
+            self.assertEqual([list(row) for row in connection.execute(f"SELECT {columns} FROM shells ORDER BY shell_id")], expected)
+        finally:
+            connection.close()
+        if 'parquet' in outputs:
+            import pyarrow.parquet as pq
+            table = pq.read_table(str(Path(outputs['parquet']) / "shells.parquet"))
+            self.assertEqual([list(row) for row in zip(*(table.column(key).to_pylist() for key in keys))], expected)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_parquet_row_groups(self):
+        import pyarrow.parquet as pq
+        shells = self.records(100, 400)
+        with patch('naval_weapons_table.PARQUET_ROW_GROUP_SIZE', 50):
+            folder = self.write('parquet', 'parquet_table', 100, 400)
+        parquet_file = pq.ParquetFile(str(Path(folder) / "shells.parquet"))
+        self.assertEqual(parquet_file.metadata.num_rows, len(shells))
+        self.assertEqual(parquet_file.metadata.num_row_groups, -(-len(shells) // 50))
+        self.assertEqual(pq.read_table(str(Path(folder) / "shells.parquet")).column("bullet_key").to_pylist(), [shell["bullet_key"] for shell in shells])
+
+
+if __name__ == '__main__':
+    unittest.main()
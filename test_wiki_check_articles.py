@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import patch
 import io
+import argparse
 from wiki_check_articles import check_sections, process_category_page, get_links_to_analyze, analyze_pages
+from wiki_check_articles import ArticleSections, CoverageReport, stratified_sample, wilson_interval, default_checker, confidence_level
 
 # run with: python -m unittest test_wiki_check_articles.py
 class TestWikiCheckArticles(unittest.TestCase):
@@ -134,6 +136,43 @@ class TestWikiCheckArticles(unittest.TestCase):
         links = get_links_to_analyze(url)
         self.assertGreater(len(links), 0)
 
+    def test_default_checker_is_shared(self):
+        checker = default_checker()
+        self.assertIs(default_checker(), checker)
+        with patch.object(checker, 'get_page_content', return_value=None) as get_page_content:
+            self.assertEqual(check_sections("https://wiki.warthunder.com/Missing"), ArticleSections(None, [], []))
+            get_page_content.assert_called_once_with("https://wiki.warthunder.com/Missing")
+
+    def test_stratified_sample(self):
+        groups = {"Big": [f"big_{i}" for i in range(200)], "Small": [f"small_{i}" for i in range(12)], "Single": ["single"]}
+        sample = stratified_sample(groups, 0.1, seed=1)
+        self.assertEqual(sum(1 for link in sample if link.startswith("big_")), 20)
+        self.assertEqual(sum(1 for link in sample if link.startswith("small_")), 1)
+        self.assertEqual(sample["single"], 1)
+        self.assertEqual(sum(sample.values()), 213) # every page is represented once
+        self.assertEqual(stratified_sample(groups, 0.1, seed=1), sample)
+
+    def test_sampled_coverage_estimate(self):
+        low, high = wilson_interval(8, 10)
+        self.assertAlmostEqual(low, 0.490, places=3)
+        self.assertAlmostEqual(high, 0.943, places=3)
+
+        report = CoverageReport(3, population=30)
+        report.add(ArticleSections("A", ["History"], []), weight=20)
+        report.add(ArticleSections("B", [], ["History"]), weight=5)
+        report.add(ArticleSections("C", [], ["History"]), weight=5)
+        coverage, low, high = report.section_estimate("History")
+        self.assertAlmostEqual(coverage, 200 / 3)
+        self.assertLess(low, coverage)
+        self.assertGreater(high, coverage)
+        self.assertIsNone(report.section_estimate("Mobility"))
+        self.assertAlmostEqual(report.group_estimate("pages_with_no_content"), 100 / 3)
+        self.assertEqual(report.group_estimate("pages_almost_completed"), 0)
+        self.assertEqual(confidence_level("0.9"), 0.9)
+        for value in ("0", "1", "95"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                confidence_level(value)
+
 
 if __name__ == '__main__':
     unittest.main()
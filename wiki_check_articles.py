@@ -1,17 +1,25 @@
+import sys
+import math
+import random
+import logging
+import argparse
 import requests
-try:
-    from bs4 import BeautifulSoup
-except ImportError:
-    print("Error: The 'bs4' package is not installed.")
-    print("To install it, run: pip install beautifulsoup4")
-    exit(1)
 import concurrent.futures
 from collections import defaultdict
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple, Optional, Tuple
 import re
 from urllib.parse import urljoin
 
 # sample command:
 # python wiki_check_articles.py "https://wiki.warthunder.com/Category:Sixth_rank_ships"
+# quick estimate from 10% of the pages of every subcategory:
+# python wiki_check_articles.py "https://wiki.warthunder.com/Category:Ships" --sample 0.1
+#
+# It can also be used as a library, reusing the HTTP session across many queries:
+#   checker = WikiChecker()
+#   report = checker.process_results(checker.get_links_to_analyze(url))
 
 WIKI_BASE_URL = "https://wiki.warthunder.com"
 SECTIONS_TO_CHECK = [
@@ -21,7 +29,7 @@ SECTIONS_TO_CHECK = [
     "Primary armament", # Naval
     "Main armament", # Ground
     "Offensive armament", # Air, Helicopters
-    "Secondary armament", 
+    "Secondary armament",
     "Anti-aircraft armament",
     "Additional armament",
     "Suspended armament", # Air, Drones, Helicopters
@@ -32,287 +40,444 @@ SECTIONS_TO_CHECK = [
     "History"
 ]
 
-def get_page_content(url):
-    try:
-        response = requests.get(url)
-        if response.status_code == 502:
-            print(f"\nWiki errored with 502 code when trying to read {url}. Stopping the program. Please, try again in a few seconds.")
-            sys.exit(1)
-        if response.status_code == 404:  # Handle 404 silently
-            print(f"\nWiki errored with 404 code when trying to read {url}.")
+logger = logging.getLogger("wiki_check_articles")
+
+
+class WikiUnavailableError(Exception):
+    """The wiki answered with 502, which usually goes away after a few seconds."""
+
+
+class ArticleSections(NamedTuple):
+    title: Optional[str] # None if the page couldn't be read
+    found: List[str] # sections with content
+    missing: List[str] # sections present on the page, but without content
+
+
+@dataclass
+class CoverageReport:
+    """Results of process_results: the completed and missing sections, and the groups of pages by how much content they have."""
+    total_pages: int
+    section_counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    missing_sections: Dict[str, List[str]] = field(default_factory=lambda: defaultdict(list))
+    pages_with_no_content: List[str] = field(default_factory=list) # pages missing all sections
+    pages_almost_no_content: List[str] = field(default_factory=list) # pages missing all sections except one
+    pages_almost_completed: List[str] = field(default_factory=list) # pages missing only one section
+    population: Optional[int] = None # number of pages the checked ones were sampled from, None if all of them were checked
+    section_weights: Dict[str, List[Tuple[float, bool]]] = field(default_factory=lambda: defaultdict(list)) # (weight, completed) of every page with the section
+    checked_weight: float = 0.0 # summed weight of the checked pages
+    group_weights: Dict[str, float] = field(default_factory=lambda: defaultdict(float)) # summed weight of the pages of each group, by the name of its list
+
+    def add(self, article, sections=SECTIONS_TO_CHECK, weight=1.0):
+        """Counts the sections of a checked article. weight is the number of pages it stands for in a sample."""
+        title, found_sections_with_content, found_sections_with_no_content = article
+        if not title:
+            return
+        self.checked_weight += weight
+        # Track which sections are present and missing
+        for checked_section in sections:
+            # check if the section is present on the list of sections with content
+            if checked_section in found_sections_with_content:
+                self.section_counts[checked_section] += 1
+                self.section_weights[checked_section].append((weight, True))
+            # check if the section is missing the content
+            elif checked_section in found_sections_with_no_content:
+                self.missing_sections[checked_section].append(title)
+                self.section_weights[checked_section].append((weight, False))
+
+        # additional groups of pages
+        groups = []
+        if len(found_sections_with_no_content) > 0 and len(found_sections_with_content) == 0:
+            groups.append("pages_with_no_content")
+        if len(found_sections_with_no_content) > 0 and len(found_sections_with_content) == 1:
+            groups.append("pages_almost_no_content")
+        if len(found_sections_with_content) > 0 and len(found_sections_with_no_content) == 1:
+            groups.append("pages_almost_completed")
+        for group in groups:
+            getattr(self, group).append(title)
+            self.group_weights[group] += weight
+
+    def section_coverage(self, section):
+        """(pages with the section completed, pages with the section), or None if no page has it."""
+        total_pages_in_section = len(self.missing_sections[section]) + self.section_counts[section]
+        if total_pages_in_section == 0:
             return None
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        print(f"Error fetching {url}: {e}")
-        return None
+        return self.section_counts[section], total_pages_in_section
 
-def check_sections(url):
-    content = get_page_content(url)
-    if not content:
-        return None, []
-    
-    soup = BeautifulSoup(content, 'html.parser')
-    
-    # Get page title
-    title = soup.find('h1', {'id': 'firstHeading'})
-    if title:
-        title = title.text.strip()
-    else:
-        title = url.split('/')[-1]
-    
-    found_sections_with_content = []
-    found_sections_with_no_content = []
-    
-    # Check Description section - requires at least 2 paragraphs
-    for header in soup.find_all(['h2', 'h3']):
-        if header.get_text().strip() == "Description":
-            paragraph_count = 0
-            current = header.next_sibling
-            while current and not current.name in ['h2', 'h3']:
-                if current.name == 'p' and current.get_text().strip():
-                    paragraph_count += 1
-                current = current.next_sibling
-            
-            if paragraph_count >= 2:
-                found_sections_with_content.append("Description")
-            else:
-                found_sections_with_no_content.append("Description")
-    
-    # Check all other sections - require real content (not just template text)
-    for header in soup.find_all(['h2', 'h3']):  # Look for both h2 and h3 headers
-        header_text = header.get_text().strip()
-        
-        # Skip Description as it's handled separately
-        if header_text == "Description":
+    def section_estimate(self, section, confidence=0.95):
+        """
+        (coverage, low, high) in percent for the section, or None if no checked page has it. The coverage is weighted by
+        the sample weights, and low-high is its Wilson score interval over the effective sample size of the weights.
+        Without sampling it's the plain percentage of the checked pages.
+        """
+        entries = self.section_weights[section]
+        if not entries:
+            return None
+        total = sum(weight for weight, _ in entries)
+        coverage = sum(weight for weight, completed in entries if completed) / total
+        effective_size = total ** 2 / sum(weight ** 2 for weight, _ in entries)
+        low, high = wilson_interval(coverage * effective_size, effective_size, confidence)
+        return coverage * 100, low * 100, high * 100
+
+    def group_estimate(self, group):
+        """
+        Share in percent of the pages in a group ("pages_with_no_content", "pages_almost_no_content" or "pages_almost_completed"),
+        weighted by the sample weights like section_estimate, out of the checked pages.
+        """
+        if not self.checked_weight:
+            return 0.0
+        return self.group_weights[group] / self.checked_weight * 100
+
+    def as_tuple(self):
+        return self.section_counts, self.missing_sections, self.pages_with_no_content, self.pages_almost_completed, self.pages_almost_no_content
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    """Wilson score interval (low, high) of a proportion of successes out of n trials. n doesn't have to be whole."""
+    if n <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def stratified_sample(groups, fraction, minimum=1, seed=None):
+    """
+    Draws a stratified random sample from {group name: links}: the given fraction of every group, rounded, but at least
+    minimum links of it. Returns {link: weight}, the weight being how many links of its group the sampled link stands for.
+    """
+    rng = random.Random(seed)
+    sample = {}
+    for links in groups.values():
+        if not links:
             continue
-            
-        # Check if this header matches any of our target sections
-        for section in SECTIONS_TO_CHECK:
-            if section.lower() == header_text.lower():
-                # Check content between this header and the next header of same or higher level
+        size = min(len(links), max(minimum, round(len(links) * fraction)))
+        for link in rng.sample(sorted(links), size):
+            sample[link] = len(links) / size
+    return sample
+
+def parse_html(content):
+    """BeautifulSoup of the page. bs4 is only imported when the first page gets parsed."""
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        raise ImportError("Error: The 'bs4' package is not installed.\nTo install it, run: pip install beautifulsoup4") from None
+    return BeautifulSoup(content, 'html.parser')
+
+def is_page_link(href):
+    return href and not href.startswith('#') and not 'action=edit' in href
+
+
+class WikiChecker:
+    """
+    Checks the wiki articles, reusing one HTTP session. Nothing is printed: the progress goes to the "wiki_check_articles"
+    logger and a 502 from the wiki raises WikiUnavailableError.
+    include_subcategories is called with {subcategory url: (name, page count)} when a category has subcategories and
+    returns whether their pages should be included too. By default they are not.
+    """
+    def __init__(self, base_url=WIKI_BASE_URL, sections=SECTIONS_TO_CHECK, session=None, max_workers=5, include_subcategories=None):
+        self.base_url = base_url
+        self.sections = sections
+        self.session = session or requests.Session()
+        self.max_workers = max_workers
+        self.include_subcategories = include_subcategories or (lambda subcategories: False)
+
+    def get_page_content(self, url):
+        try:
+            response = self.session.get(url)
+            if response.status_code == 502:
+                raise WikiUnavailableError(f"Wiki errored with 502 code when trying to read {url}. Stopping the program. Please, try again in a few seconds.")
+            if response.status_code == 404:  # Handle 404 silently
+                logger.warning(f"Wiki errored with 404 code when trying to read {url}.")
+                return None
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            logger.error(f"Error fetching {url}: {e}")
+            return None
+
+    def check_sections(self, url):
+        """Returns the ArticleSections of the article, with a None title if it couldn't be read."""
+        content = self.get_page_content(url)
+        if not content:
+            return ArticleSections(None, [], [])
+
+        soup = parse_html(content)
+
+        # Get page title
+        title = soup.find('h1', {'id': 'firstHeading'})
+        if title:
+            title = title.text.strip()
+        else:
+            title = url.split('/')[-1]
+
+        found_sections_with_content = []
+        found_sections_with_no_content = []
+
+        # Check Description section - requires at least 2 paragraphs
+        for header in soup.find_all(['h2', 'h3']):
+            if header.get_text().strip() == "Description":
+                paragraph_count = 0
                 current = header.next_sibling
-                has_real_content = False
-                
-                # Determine what level headers to stop at based on current header
-                # History section special handling - content can start with h3
-                stop_tags = ['h2'] if section == 'History' and header.name == 'h2' else ['h2', 'h3']
-                
-                while current and not current.name in stop_tags:
-
-                    # History section special handling - Check if there are any h3 subsections under h2
-                    # Not a perfect solution, but I haven't found any page where it would cause false positives
-                    # If you have found a page where this causes a problem - contact Jareel_Skaj
-                    if header.name == 'h2' and current.name == 'h3' and (not current.contents[0].name == 'i'):
-                        has_real_content = True
-                        break
-                    
-                    if current.name in ['p', 'ul', 'li']:
-                        text = current.get_text().strip()
-                        if (text and (not current.contents[0].name == 'i')):
-                            # Check if it's not just headers, empty bullets, main article links, or ammo lists
-                            if (not text.startswith('Main article') and 
-                                not text in ['Pros:', 'Cons:', '•'] and
-                                not current.find('b')):  # Skip bullet points that start with bold text (ammo lists)
-                                has_real_content = True
-                                break
+                while current and not current.name in ['h2', 'h3']:
+                    if current.name == 'p' and current.get_text().strip():
+                        paragraph_count += 1
                     current = current.next_sibling
-                if has_real_content:
-                    found_sections_with_content.append(section)
-                else:
-                    found_sections_with_no_content.append(section)
-                break
-    
-    return title, found_sections_with_content, found_sections_with_no_content
 
-def process_category_page(url, processed_categories=None):
-    if processed_categories is None:
-        processed_categories = set()
-    
-    if url in processed_categories:
-        return []
-    
-    processed_categories.add(url)
-    content = get_page_content(url)
-    if not content:
-        return []
-    
-    soup = BeautifulSoup(content, 'html.parser')
-       
-    category_name = soup.find('h1', {'id': 'firstHeading'}).text.strip()
-    print(f"Processing: {category_name}", end="\n")
-    
-    # Try different possible category content locations
-    category_elements = soup.select('div.mw-category')
-    if not category_elements:
-        # Fallback to li elements only if no mw-category div is found
-        category_elements = soup.select('.mw-content-ltr li')
-    
-    if not category_elements:
-        print(f"Found 0 pages to analyze in {category_name}")
-        return []
-    
-    links = set()  # Set to store unique links
-    duplicates_count = 0
-    
-    # Find regular page links across all category elements
-    for element in category_elements:
-        for link in element.find_all('a'):
-            href = link.get('href')
-            if href and not href.startswith('#') and not 'action=edit' in href:
-                full_url = urljoin(WIKI_BASE_URL, href)
-                if full_url in links:
-                    duplicates_count += 1
+                if paragraph_count >= 2:
+                    found_sections_with_content.append("Description")
                 else:
-                    links.add(full_url)
-    
-    if len(links) == 0:
-        print(f"\nFound 0 pages to analyze in {category_name}")
-        return []
-    
-    if duplicates_count > 0:
-        print(f"\n{duplicates_count} articles from {category_name} were already added")
-    
-    subcategories = {}  # Changed to dict to store subcategory URLs and names
-
-    # Find subcategories
-    subcats_div = soup.find('div', {'id': 'mw-subcategories'})
-    if subcats_div:
-        for link in subcats_div.find_all('a'):
-            href = link.get('href')
-            if href and not href.startswith('#') and not 'action=edit' in href:
-                subcat_url = urljoin(WIKI_BASE_URL, href)
-                subcat_name = link.text.strip()
-                # Get page count for each subcategory
-                subcat_content = get_page_content(subcat_url)
-                if subcat_content:
-                    subcat_soup = BeautifulSoup(subcat_content, 'html.parser')
-                    category_elements = subcat_soup.select('div.mw-category, .mw-content-ltr li')
-                    
-                    subcat_links = 0
-                    if category_elements:
-                        subcat_links = len([l for element in category_elements 
-                                          for l in element.find_all('a')
-                                          if l.get('href') and not l.get('href').startswith('#') 
-                                          and not 'action=edit' in l.get('href')])
-                    subcategories[subcat_url] = (subcat_name, subcat_links)
-    
-    # If subcategories exist, show them with page counts and ask user
-    if subcategories:
-        subcats_info = [f"{name} ({count} pages)" for _, (name, count) in subcategories.items()]
-        print("\nSubcategories found:", end=" ")
-        print(", ".join(subcats_info))
-        
-        # Calculate total pages in all subcategories
-        total_subcat_pages = sum(count for _, (_, count) in subcategories.items())
-        
-        if total_subcat_pages > 0:
-            response = input("Would you like to include links from the subcategories? (y/n/quit): ").lower()
-            if (response == 'q' or response == 'quit'):
-                sys.exit(0)
-            elif (response == 'y' or response == 'yes' or response == '1'):
-                for subcat_url, (subcat_name, _) in subcategories.items():
-                    subcat_links = process_category_page(subcat_url, processed_categories)
-                    links.update(subcat_links)  # Using update() to merge sets
-    
-    return list(links)  # Convert back to list before returning
+                    found_sections_with_no_content.append("Description")
 
-def process_results(page_links):
-    section_counts = defaultdict(int)
-    missing_sections = defaultdict(list)  # Track pages missing each section
-    pages_with_no_content = []  # Track pages missing all sections
-    pages_almost_no_content = []  # Track pages missing all sections except one
-    pages_almost_completed = []  # Track pages missing only one section
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_url = {executor.submit(check_sections, url): url for url in page_links}
-        
-        for future in concurrent.futures.as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                title, found_sections_with_content, found_sections_with_no_content = future.result()
-                if title:
-                    # Track which sections are present and missing
-                    required_section_count = 0
-                    
-                    for checked_section in SECTIONS_TO_CHECK:
-                        # For all other required sections
-                        required_section_count += 1
-                        # check if the section is present on the list of sections with content
-                        if checked_section in found_sections_with_content:
-                            section_counts[checked_section] += 1
-                        # check if the section is missing the content
-                        elif checked_section in found_sections_with_no_content:
-                            missing_sections[checked_section].append(title)
-
-                    # additional groups of pages
-                    if len(found_sections_with_no_content) > 0 and len(found_sections_with_content) == 0:
-                        pages_with_no_content.append(title)
-                    if len(found_sections_with_no_content) > 0 and len(found_sections_with_content) == 1:
-                        pages_almost_no_content.append(title)
-                    if len(found_sections_with_content) > 0 and len(found_sections_with_no_content) == 1:
-                        pages_almost_completed.append(title)         
-                
-            except Exception as e:
-                print(f"Error processing {url}: {e}")
-    
-    return section_counts, missing_sections, pages_with_no_content, pages_almost_completed, pages_almost_no_content
+        # Check all other sections - require real content (not just template text)
+        for header in soup.find_all(['h2', 'h3']):  # Look for both h2 and h3 headers
+            header_text = header.get_text().strip()
+
+            # Skip Description as it's handled separately
+            if header_text == "Description":
+                continue
+
+            # Check if this header matches any of our target sections
+            for section in self.sections:
+                if section.lower() == header_text.lower():
+                    # Check content between this header and the next header of same or higher level
+                    current = header.next_sibling
+                    has_real_content = False
+
+                    # Determine what level headers to stop at based on current header
+                    # History section special handling - content can start with h3
+                    stop_tags = ['h2'] if section == 'History' and header.name == 'h2' else ['h2', 'h3']
+
+                    while current and not current.name in stop_tags:
+
+                        # History section special handling - Check if there are any h3 subsections under h2
+                        # Not a perfect solution, but I haven't found any page where it would cause false positives
+                        # If you have found a page where this causes a problem - contact Jareel_Skaj
+                        if header.name == 'h2' and current.name == 'h3' and (not current.contents[0].name == 'i'):
+                            has_real_content = True
+                            break
+
+                        if current.name in ['p', 'ul', 'li']:
+                            text = current.get_text().strip()
+                            if (text and (not current.contents[0].name == 'i')):
+                                # Check if it's not just headers, empty bullets, main article links, or ammo lists
+                                if (not text.startswith('Main article') and
+                                    not text in ['Pros:', 'Cons:', '•'] and
+                                    not current.find('b')):  # Skip bullet points that start with bold text (ammo lists)
+                                    has_real_content = True
+                                    break
+                        current = current.next_sibling
+                    if has_real_content:
+                        found_sections_with_content.append(section)
+                    else:
+                        found_sections_with_no_content.append(section)
+                    break
+
+        return ArticleSections(title, found_sections_with_content, found_sections_with_no_content)
+
+    def count_category_links(self, url):
+        """Number of page links on a category page, or None if it couldn't be read."""
+        content = self.get_page_content(url)
+        if not content:
+            return None
+        category_elements = parse_html(content).select('div.mw-category, .mw-content-ltr li')
+        return len([l for element in category_elements for l in element.find_all('a') if is_page_link(l.get('href'))])
+
+    def process_category_page(self, url, processed_categories=None, groups=None):
+        """
+        Returns the links of the category page, and of its subcategories if include_subcategories agrees.
+        If a groups dict is given, the links found on each category page are also added to it as {category name: links};
+        a link listed in several categories is kept in the first one.
+        """
+        if processed_categories is None:
+            processed_categories = set()
+
+        if url in processed_categories:
+            return []
+
+        processed_categories.add(url)
+        content = self.get_page_content(url)
+        if not content:
+            return []
+
+        soup = parse_html(content)
+
+        category_name = soup.find('h1', {'id': 'firstHeading'}).text.strip()
+        logger.info(f"Processing: {category_name}")
+
+        # Try different possible category content locations
+        category_elements = soup.select('div.mw-category')
+        if not category_elements:
+            # Fallback to li elements only if no mw-category div is found
+            category_elements = soup.select('.mw-content-ltr li')
+
+        if not category_elements:
+            logger.info(f"Found 0 pages to analyze in {category_name}")
+            return []
+
+        links = set()  # Set to store unique links
+        duplicates_count = 0
+
+        # Find regular page links across all category elements
+        for element in category_elements:
+            for link in element.find_all('a'):
+                href = link.get('href')
+                if is_page_link(href):
+                    full_url = urljoin(self.base_url, href)
+                    if full_url in links:
+                        duplicates_count += 1
+                    else:
+                        links.add(full_url)
+
+        if len(links) == 0:
+            logger.info(f"Found 0 pages to analyze in {category_name}")
+            return []
+
+        if duplicates_count > 0:
+            logger.info(f"{duplicates_count} articles from {category_name} were already added")
+
+        if groups is not None:
+            grouped = set().union(*groups.values())
+            groups.setdefault(category_name, []).extend(sorted(links - grouped))
+
+        subcategories = {}  # subcategory URL -> (name, page count)
+
+        # Find subcategories
+        subcats_div = soup.find('div', {'id': 'mw-subcategories'})
+        if subcats_div:
+            for link in subcats_div.find_all('a'):
+                href = link.get('href')
+                if is_page_link(href):
+                    subcat_url = urljoin(self.base_url, href)
+                    # Get page count for each subcategory
+                    subcat_links = self.count_category_links(subcat_url)
+                    if subcat_links is not None:
+                        subcategories[subcat_url] = (link.text.strip(), subcat_links)
+
+        # If subcategories exist, show them with page counts and ask whether to include them
+        if subcategories:
+            subcats_info = [f"{name} ({count} pages)" for _, (name, count) in subcategories.items()]
+            logger.info(f"Subcategories found: {', '.join(subcats_info)}")
+
+            # Calculate total pages in all subcategories
+            total_subcat_pages = sum(count for _, (_, count) in subcategories.items())
+
+            if total_subcat_pages > 0 and self.include_subcategories(subcategories):
+                for subcat_url in subcategories:
+                    links.update(self.process_category_page(subcat_url, processed_categories, groups))
+
+        return list(links)
+
+    def get_links_to_analyze(self, url):
+        """Get list of links to analyze - either from category page or single article"""
+        content = self.get_page_content(url)
+        if not content:
+            return []
+
+        # Check if this is a direct article link
+        if parse_html(content).find('div', class_='specs_card_main'):
+            return [url]
+
+        # Otherwise process as category
+        return self.process_category_page(url)
+
+    def get_links_by_category(self, url):
+        """Like get_links_to_analyze, but with the links grouped by the (sub)category they were found in: {category name: links}."""
+        content = self.get_page_content(url)
+        if not content:
+            return {}
+
+        if parse_html(content).find('div', class_='specs_card_main'):
+            return {url.split('/')[-1].replace('_', ' '): [url]}
+
+        groups = {}
+        self.process_category_page(url, groups=groups)
+        return {name: links for name, links in groups.items() if links}
+
+    def iter_sections(self, page_links):
+        """Yields (url, ArticleSections) of the pages as they get checked, in parallel. Pages that fail are logged and skipped."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_url = {executor.submit(self.check_sections, url): url for url in page_links}
+
+            for future in concurrent.futures.as_completed(future_to_url):
+                url = future_to_url[future]
+                try:
+                    yield url, future.result()
+                except WikiUnavailableError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error processing {url}: {e}")
+
+    def process_results(self, page_links, weights=None):
+        """Checks the pages and returns their CoverageReport. weights optionally gives the sample weight of every link."""
+        report = CoverageReport(len(page_links))
+        for url, article in self.iter_sections(page_links):
+            report.add(article, self.sections, weights[url] if weights else 1.0)
+        return report
+
+    def sample_results(self, groups, fraction, minimum=1, seed=None):
+        """
+        Checks only a stratified random sample (see stratified_sample) of the grouped links, e.g. from get_links_by_category,
+        and returns its CoverageReport with the population set, for the estimates of section_estimate.
+        """
+        sample = stratified_sample(groups, fraction, minimum, seed)
+        report = self.process_results(list(sample), sample)
+        report.population = sum(len(links) for links in groups.values())
+        return report
+
+
+def ask_include_subcategories(subcategories):
+    """include_subcategories of the command line: asks the user, quit exits."""
+    response = input("Would you like to include links from the subcategories? (y/n/quit): ").lower()
+    if (response == 'q' or response == 'quit'):
+        sys.exit(0)
+    return (response == 'y' or response == 'yes' or response == '1')
+
+def print_report(report, sections=SECTIONS_TO_CHECK, confidence=0.95):
+    section_counts, missing_sections = report.section_counts, report.missing_sections
+    pages_with_no_content, pages_almost_completed, pages_almost_no_content = report.pages_with_no_content, report.pages_almost_completed, report.pages_almost_no_content
 
-def get_links_to_analyze(url):
-    """Get list of links to analyze - either from category page or single article"""
-    content = get_page_content(url)
-    if not content:
-        return []
-    
-    soup = BeautifulSoup(content, 'html.parser')
-    
-    # Check if this is a direct article link
-    if soup.find('div', class_='specs_card_main'):
-        return [url]
-    
-    # Otherwise process as category
-    return process_category_page(url)
-
-def analyze_pages(url):
-    """Analyze either a category of pages or single article page"""
-    print(f"Analyzing: {url}")
-    page_links = get_links_to_analyze(url)
-    
-    if not page_links:
-        name = url.split('/')[-1].replace('_', ' ')
-        print(f"Found 0 pages to analyze in {name}")
-        return
-    
-    print(f"Found {len(page_links)} pages to analyze")
-    
-    section_counts, missing_sections, pages_with_no_content, pages_almost_completed, pages_almost_no_content = process_results(page_links)
-    
     # Print statistics
-    total_pages = len(page_links)
-    print(f"\n=== Section Coverage Statistics for {total_pages} pages ===")
-    for checked_section in SECTIONS_TO_CHECK:
-        total_pages_in_section = (len(missing_sections[checked_section])+section_counts[checked_section])
-        if (total_pages_in_section > 0):
-            percentage = (section_counts[checked_section] / total_pages_in_section) * 100
-            print(f"{checked_section}: {percentage:.1f}% ({section_counts[checked_section]} pages completed)")
-    
+    total_pages = report.total_pages
+    if report.population is None:
+        print(f"\n=== Section Coverage Statistics for {total_pages} pages ===")
+    else:
+        print(f"\n=== Section Coverage Estimates from a sample of {total_pages} of {report.population} pages ({confidence:.0%} confidence intervals) ===")
+    for checked_section in sections:
+        coverage = report.section_coverage(checked_section)
+        if coverage:
+            completed, total_pages_in_section = coverage
+            if report.population is None:
+                percentage = (completed / total_pages_in_section) * 100
+                print(f"{checked_section}: {percentage:.1f}% ({completed} pages completed)")
+            else:
+                percentage, low, high = report.section_estimate(checked_section, confidence)
+                print(f"{checked_section}: {percentage:.1f}% ({low:.1f}-{high:.1f}%, {completed} of {total_pages_in_section} sampled pages completed)")
+
+    # In a sample the shares of the groups are estimated with the sample weights, like the sections
+    def group_share(group, pages):
+        if report.population is None:
+            return (len(pages) / total_pages) * 100, f"{len(pages)} pages"
+        return report.group_estimate(group), f"{len(pages)} sampled pages"
+
     if len(pages_with_no_content) > 0:
         # Add statistics for pages with no content in any section
-        no_content_percentage = (len(pages_with_no_content) / total_pages) * 100
-        print(f"⚠ Pages with no content: {no_content_percentage:.1f}% ({len(pages_with_no_content)} pages missing content)")    
+        no_content_percentage, pages = group_share("pages_with_no_content", pages_with_no_content)
+        print(f"⚠ Pages with no content: {no_content_percentage:.1f}% ({pages} missing content)")
     if len(pages_almost_no_content) > 0:
         # Add statistics for pages with just 1 section completed
-        almost_no_content_percentage = (len(pages_almost_no_content) / total_pages) * 100
-        print(f"⚠ Pages with just 1 section completed: {almost_no_content_percentage:.1f}% ({len(pages_almost_no_content)} pages missing content)")    
-        
+        almost_no_content_percentage, pages = group_share("pages_almost_no_content", pages_almost_no_content)
+        print(f"⚠ Pages with just 1 section completed: {almost_no_content_percentage:.1f}% ({pages} missing content)")
+
     if len(pages_almost_completed) > 0:
-        almost_completed_percentage = (len(pages_almost_completed) / total_pages) * 100
-        print(f"⚠ Almost ready: {almost_completed_percentage:.1f}% ({len(pages_almost_completed)} pages missing just one section)")
-    
-    if (any(len(missing_sections[section]) > 0 for section in SECTIONS_TO_CHECK) or len(pages_almost_completed)>0 or len(pages_with_no_content)>0):
+        almost_completed_percentage, pages = group_share("pages_almost_completed", pages_almost_completed)
+        print(f"⚠ Almost ready: {almost_completed_percentage:.1f}% ({pages} missing just one section)")
+
+    if (any(len(missing_sections[section]) > 0 for section in sections) or len(pages_almost_completed)>0 or len(pages_with_no_content)>0):
         # Print missing sections report
         print("\n=== Missing Section Content ===")
-        for checked_section in SECTIONS_TO_CHECK:
+        for checked_section in sections:
             missing_count = len(missing_sections[checked_section])
             if missing_count > 0:
                 print(f"\n{checked_section} (missing in {missing_count} pages):")
@@ -331,10 +496,88 @@ def analyze_pages(url):
             for title in pages_with_no_content:
                 print(f"- {title}")
 
-if __name__ == "__main__":
-    import sys
-    if len(sys.argv) != 2:
-        print("Usage: python wiki_check.articles.py <full URL to the category on War Thunder Wiki>")
+
+# The functions below keep the interface of the command line version, with a checker that asks about the subcategories with input()
+_default_checker = None
+
+def default_checker():
+    """The checker shared by the functions below, created on first use so they all reuse its HTTP session."""
+    global _default_checker
+    if _default_checker is None:
+        _default_checker = WikiChecker(WIKI_BASE_URL, include_subcategories=ask_include_subcategories)
+    return _default_checker
+
+def get_page_content(url):
+    return default_checker().get_page_content(url)
+
+def check_sections(url):
+    return default_checker().check_sections(url)
+
+def process_category_page(url, processed_categories=None):
+    return default_checker().process_category_page(url, processed_categories)
+
+def process_results(page_links):
+    return default_checker().process_results(page_links).as_tuple()
+
+def get_links_to_analyze(url):
+    """Get list of links to analyze - either from category page or single article"""
+    return default_checker().get_links_to_analyze(url)
+
+def analyze_pages(url, checker=None, sample=None, seed=None, confidence=0.95):
+    """
+    Analyze either a category of pages or single article page.
+    With sample (a fraction, e.g. 0.1) only a random sample of the pages of every subcategory is checked, and the coverage is estimated with confidence intervals.
+    """
+    checker = checker or default_checker()
+    print(f"Analyzing: {url}")
+    if sample:
+        groups = checker.get_links_by_category(url)
+        page_count = sum(len(links) for links in groups.values())
+    else:
+        page_links = checker.get_links_to_analyze(url)
+        page_count = len(page_links)
+
+    if not page_count:
+        name = url.split('/')[-1].replace('_', ' ')
+        print(f"Found 0 pages to analyze in {name}")
+        return
+
+    if sample:
+        print(f"Found {page_count} pages in {len(groups)} categories, checking a sample of {sample:.0%} of each")
+        report = checker.sample_results(groups, sample, seed=seed)
+    else:
+        print(f"Found {page_count} pages to analyze")
+        report = checker.process_results(page_links)
+    print_report(report, checker.sections, confidence)
+    return report
+
+def sample_fraction(value):
+    fraction = float(value)
+    if not 0 < fraction <= 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a fraction between 0 and 1")
+    return fraction
+
+def confidence_level(value):
+    level = float(value)
+    if not 0 < level < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a confidence level between 0 and 1 (e.g. 0.95)")
+    return level
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the articles of a War Thunder Wiki category (or a single article) for missing sections.")
+    parser.add_argument('url', help="Full URL to the category on War Thunder Wiki")
+    parser.add_argument('--sample', type=sample_fraction, metavar='FRACTION', help="Check only this fraction (e.g. 0.1) of the pages of every subcategory, picked at random, and estimate the coverage of each section with confidence intervals")
+    parser.add_argument('--seed', type=int, help="Random seed of --sample, to check the same pages again")
+    parser.add_argument('--confidence', type=confidence_level, default=0.95, help="Confidence level of the --sample intervals, between 0 and 1 (default 0.95)")
+    args = parser.parse_args()
+
+    # The progress messages go to stderr, so stdout holds only the report
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    try:
+        analyze_pages(args.url, sample=args.sample, seed=args.seed, confidence=args.confidence)
+    except (WikiUnavailableError, ImportError) as e:
+        print(e, file=sys.stderr)
         sys.exit(1)
-    
-    analyze_pages(sys.argv[1])
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()